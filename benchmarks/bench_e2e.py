@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Benchmark end-to-end do coletor (offline)
+=========================================
+Roda o pipeline de verdade (fetch → prepare → tts → deliver) contra:
+  - um servidor HTTP local que serve as fixtures de benchmarks/fixtures/
+    (os 17 feeds do feeds_config.json) e feeds sintéticos grandes, com
+    ETag/304 e gzip como os servidores reais
+  - uma Bot API falsa do Telegram (Config.TELEGRAM_API_URL) que aceita e
+    contabiliza os envios
+  - TTS "silence" por padrão (WAV mudo do tamanho que o Piper geraria), já
+    que o edge-tts depende da rede; --tts real usa os engines configurados
+
+Cada execução roda num processo novo e numa pasta de dados temporária:
+"cold" (cache vazio) e, em seguida, "warm" (mesma pasta: 304, caches e
+duplicatas). Mede tempo por estágio, CPU, pico de RSS e itens/s, e grava
+o resultado em benchmarks/results/<commit>.json para comparar commits.
+
+Uso:
+    python benchmarks/bench_e2e.py                        # 3 repetições, pipeline
+    python benchmarks/bench_e2e.py --mode sequential      # process_feed feed a feed
+    python benchmarks/bench_e2e.py --large 4 --large-items 5000
+    python benchmarks/bench_e2e.py --compare benchmarks/results/abc1234.json
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from feed_fixtures import FEEDS_DIR, INDEX_FILE, generate_feed
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+# ─── Servidor local: feeds + Bot API falsa ────────────────────────────────
+
+class StandIns:
+    """Conteúdo servido e contadores do servidor local."""
+
+    def __init__(self):
+        self.feeds = {}   # caminho → (corpo, etag)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.feed_requests = 0
+            self.not_modified = 0
+            self.bytes_served = 0
+            self.telegram = {}   # método → {'calls': n, 'bytes': n}
+            self.chats = set()
+
+    def add_feed(self, path, body):
+        self.feeds[path] = (body, '"%s"' % hashlib.sha256(body).hexdigest()[:16])
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'feed_requests': self.feed_requests,
+                'not_modified': self.not_modified,
+                'bytes_served': self.bytes_served,
+                'telegram': {k: dict(v) for k, v in self.telegram.items()},
+                'chats': len(self.chats),
+            }
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status, body=b'', headers=None):
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if body:
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # O coletor fecha a conexão quando já tem as notícias
+                    self.close_connection = True
+
+        def do_GET(self):
+            entry = state.feeds.get(self.path)
+            if entry is None:
+                return self._reply(404)
+            body, etag = entry
+            with state.lock:
+                state.feed_requests += 1
+            if self.headers.get('If-None-Match') == etag:
+                with state.lock:
+                    state.not_modified += 1
+                return self._reply(304, headers={'ETag': etag})
+            headers = {'ETag': etag, 'Content-Type': 'application/rss+xml'}
+            if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                body = gzip.compress(body, compresslevel=5)
+                headers['Content-Encoding'] = 'gzip'
+            with state.lock:
+                state.bytes_served += len(body)
+            self._reply(200, body, headers)
+
+        def do_POST(self):
+            # /bot<token>/<método>: lê o corpo em blocos e responde como a Bot API
+            method = self.path.rsplit('/', 1)[-1]
+            remaining = int(self.headers.get('Content-Length', 0))
+            size, head = remaining, b''
+            while remaining > 0:
+                chunk = self.rfile.read(min(remaining, 1 << 16))
+                if not chunk:
+                    break
+                if len(head) < 4096:
+                    head += chunk[:4096]
+                remaining -= len(chunk)
+            chat = None
+            if self.headers.get('Content-Type', '').startswith('application/x-www-form-urlencoded'):
+                chat = parse_qs(head.decode('utf-8', 'replace')).get('chat_id', [None])[0]
+            elif b'name="chat_id"' in head:
+                chat = head.split(b'name="chat_id"', 1)[1].split(b'\r\n')[2].decode('utf-8', 'replace')
+            with state.lock:
+                stats = state.telegram.setdefault(method, {'calls': 0, 'bytes': 0})
+                stats['calls'] += 1
+                stats['bytes'] += size
+                if chat:
+                    state.chats.add(chat)
+                n = sum(v['calls'] for v in state.telegram.values())
+            media = {'file_id': f"bench-{n}", 'file_unique_id': f"u{n}"}
+            result = {'message_id': n, 'audio': media, 'voice': media}
+            body = json.dumps({'ok': True, 'result': result}).encode('utf-8')
+            self._reply(200, body, {'Content-Type': 'application/json'})
+
+    return Handler
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # O coletor fecha a conexão quando já tem as notícias (ou passou do
+        # teto): reset/pipe quebrado aqui é esperado, não erro do servidor
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+
+def start_server(state):
+    server = StandInServer(('127.0.0.1', 0), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def build_feeds(state, base_url, large, large_items):
+    """Registra fixtures + feeds grandes no servidor. Returns a lista para o feeds_config.json."""
+    with open(INDEX_FILE, 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    feeds = []
+    for entry in index:
+        state.add_feed(f"/{entry['file']}", (FEEDS_DIR / entry['file']).read_bytes())
+        feeds.append({'url': f"{base_url}/{entry['file']}", 'language': entry['language'],
+                      'name': entry['name']})
+    for i in range(large):
+        name = f"Synthetic Large {i + 1}"
+        path = f"/large-{i + 1}.xml"
+        state.add_feed(path, generate_feed(name, 'en', 'wordpress', large_items, 5))
+        feeds.append({'url': f"{base_url}{path}", 'language': 'en', 'name': name})
+    return feeds
+
+
+# ─── Processo filho: uma execução medida ──────────────────────────────────
+
+def _silent_episode(episode):
+    """Stand-in do TTS: WAV mudo com a duração que o Piper levaria (~60ms/caractere)."""
+    import wave
+    from src.audio_cache import audio_cache
+
+    key = hashlib.sha256(episode['audio_text'].encode('utf-8')).hexdigest()
+    path = audio_cache.path_for(key, 'wav')
+    if not path.exists():
+        frames = int(len(episode['audio_text']) * 0.06 * 22050)
+        with wave.open(str(path), 'wb') as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(22050)
+            w.writeframes(b'\x00\x00' * frames)
+    episode['audio_path'] = str(path)
+    episode['audio_name'] = f"{episode['name'][:30]}.wav"
+    return episode
+
+
+def child(options):
+    """Roda uma execução no diretório `workdir` e imprime o resultado (JSON) no stdout."""
+    start = time.perf_counter()
+    workdir = Path(options['workdir'])
+    from src.config import Config
+
+    # Tudo que o coletor grava vai para a pasta temporária
+    Config.BASE_DIR = workdir
+    Config.DATA_DIR = workdir / "data"
+    Config.AUDIO_DIR = Config.DATA_DIR / "audio"
+    Config.AUDIO_CACHE_DIR = Config.AUDIO_DIR / "cache"
+    Config.LOG_DIR = workdir / "logs"
+    Config.CONFIG_FILE = workdir / "feeds_config.json"
+    for attr in ('OUTBOX_FILE', 'TELEGRAM_FILE_IDS_FILE', 'FEED_STATS_FILE',
+                 'FEED_CACHE_FILE', 'SUMMARY_CACHE_FILE', 'HISTORY_DB',
+                 'METRICS_FILE', 'METRICS_PROM_FILE'):
+        setattr(Config, attr, Config.DATA_DIR / getattr(Config, attr).name)
+    Config.HISTORY_FILE = workdir / "history.json"
+    if options['engine']:
+        Config.SUMMARY_ENGINE = options['engine']
+    if not options['telegram_limits']:
+        Config.TELEGRAM_GLOBAL_RATE = Config.TELEGRAM_CHAT_RATE = Config.TELEGRAM_GROUP_RATE = 10000
+    Config.setup()
+
+    import main
+    from src.history import HistoryStore
+    if options['tts'] == 'silence':
+        main.synthesize_episode = _silent_episode
+    imported = time.perf_counter()
+
+    main.housekeeping()
+    feeds = main.select_feeds()
+    store = HistoryStore()
+    seen = main.load_dedupe_index(store)
+    ready = time.perf_counter()
+
+    stages, per_feed = [], []
+    if options['mode'] == 'pipeline':
+        pipeline = main.build_pipeline(seen, store)
+        records = [r for feed_records in pipeline.run(feeds) for r in feed_records]
+        stages = pipeline.stats()
+    else:
+        records = []
+        for feed in feeds:
+            t0 = time.perf_counter()
+            feed_records = main.process_feed(feed, seen=seen, store=store)
+            per_feed.append({'feed': feed['name'], 'seconds': round(time.perf_counter() - t0, 4),
+                             'items': len(feed_records)})
+            records.extend(feed_records)
+    processed = time.perf_counter()
+
+    main.persist_state(store, records)
+    store.close()
+    end = time.perf_counter()
+    main.write_run_metrics(time.time() - (end - start))
+    from src.metrics import registry
+    stage_seconds = {h['labels']['stage']: {k: h[k] for k in ('count', 'sum', 'max')}
+                     for h in registry.to_dict()['histogram'].get('newsbot_stage_seconds', [])}
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    work = processed - ready
+    print(json.dumps({
+        'items': len(records),
+        'feeds': len(feeds),
+        'phases': {
+            'import': round(imported - start, 4),
+            'startup': round(ready - imported, 4),
+            'process': round(work, 4),
+            'persist': round(end - processed, 4),
+            'total': round(end - start, 4),
+        },
+        'stages': stages,
+        'stage_seconds': stage_seconds,
+        'per_feed': per_feed,
+        'cpu_seconds': round(usage.ru_utime + usage.ru_stime, 4),
+        'cpu_children_seconds': round(children.ru_utime + children.ru_stime, 4),
+        'peak_rss_mb': round(usage.ru_maxrss / 1024, 1),
+        'items_per_second': round(len(records) / work, 2) if work else 0.0,
+        'feeds_per_second': round(len(feeds) / work, 2) if work else 0.0,
+    }))
+
+
+# ─── Orquestração ─────────────────────────────────────────────────────────
+
+def run_child(options, verbose=False):
+    env = dict(os.environ, BOT_TOKEN='bench', CHAT_ID='1000',
+               TELEGRAM_API_URL=options['telegram_url'])
+    result = subprocess.run([sys.executable, __file__, '--child', json.dumps(options)],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    if verbose or result.returncode != 0:
+        sys.stderr.write(result.stderr)
+    if result.returncode != 0:
+        raise SystemExit(f"❌ Execução falhou (código {result.returncode})")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _git_commit():
+    try:
+        sha = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return sha + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def summarize(runs):
+    """Medianas por cenário das métricas principais."""
+    keys = ('items', 'cpu_seconds', 'cpu_children_seconds', 'peak_rss_mb',
+            'items_per_second', 'feeds_per_second')
+    summary = {}
+    for scenario in sorted({r['scenario'] for r in runs}):
+        group = [r for r in runs if r['scenario'] == scenario]
+        entry = {k: statistics.median(r[k] for r in group) for k in keys}
+        entry['phases'] = {p: statistics.median(r['phases'][p] for r in group)
+                           for p in group[0]['phases']}
+        if group[0]['stages']:
+            entry['stages'] = {s['stage']: {
+                'busy_seconds': statistics.median(r['stages'][i]['busy_seconds'] for r in group),
+                'utilization': statistics.median(r['stages'][i]['utilization'] for r in group),
+            } for i, s in enumerate(group[0]['stages'])}
+        summary[scenario] = entry
+    return summary
+
+
+def print_report(summary, baseline=None):
+    for scenario, s in summary.items():
+        base = (baseline or {}).get(scenario)
+
+        def delta(value, old):
+            return f"  ({(value - old) / old:+.0%})" if old else ""
+
+        print(f"\n── {scenario} ──")
+        print(f"   itens: {s['items']:.0f}   itens/s: {s['items_per_second']:.1f}"
+              f"{delta(s['items_per_second'], base and base['items_per_second'])}")
+        print("   tempo: " + "  ".join(f"{p} {v:.3f}s" for p, v in s['phases'].items())
+              + delta(s['phases']['total'], base and base['phases']['total']))
+        print(f"   CPU: {s['cpu_seconds']:.2f}s (+{s['cpu_children_seconds']:.2f}s subprocessos)"
+              f"{delta(s['cpu_seconds'], base and base['cpu_seconds'])}   pico RSS: {s['peak_rss_mb']:.0f}MB"
+              f"{delta(s['peak_rss_mb'], base and base['peak_rss_mb'])}")
+        for stage, st in s.get('stages', {}).items():
+            print(f"   {stage:<10} ocupado {st['busy_seconds']:.3f}s  utilização {st['utilization']:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end offline")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--mode', choices=('pipeline', 'sequential'), default='pipeline')
+    parser.add_argument('--large', type=int, default=2, help='Feeds sintéticos grandes')
+    parser.add_argument('--large-items', type=int, default=2000)
+    parser.add_argument('--tts', choices=('silence', 'real'), default='silence')
+    parser.add_argument('--engine', choices=('sumy', 'textrank'), default=None,
+                        help='Engine de resumo (padrão: Config.SUMMARY_ENGINE)')
+    parser.add_argument('--telegram-limits', action='store_true',
+                        help='Mantém os limites de taxa reais do Telegram (1 msg/s por chat)')
+    parser.add_argument('--no-warm', action='store_true', help='Só o cenário cold')
+    parser.add_argument('--compare', type=Path, help='Resultado anterior para comparar')
+    parser.add_argument('--output', type=Path, help='Arquivo de saída (padrão: results/<commit>.json)')
+    parser.add_argument('--verbose', action='store_true', help='Mostra o log do coletor')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(json.loads(args.child))
+
+    state = StandIns()
+    server = start_server(state)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    feeds = build_feeds(state, base_url, args.large, args.large_items)
+    sizes = [len(body) for body, _ in state.feeds.values()]
+    print(f"{len(feeds)} feeds ({sum(sizes) // 1024}KB), modo {args.mode}, TTS {args.tts}, "
+          f"{args.repeat} repetições")
+
+    runs = []
+    for n in range(args.repeat):
+        with tempfile.TemporaryDirectory(prefix="bench_e2e_") as tmp:
+            with open(Path(tmp) / "feeds_config.json", 'w', encoding='utf-8') as f:
+                json.dump(feeds, f)
+            options = {'workdir': tmp, 'mode': args.mode, 'tts': args.tts, 'engine': args.engine,
+                       'telegram_limits': args.telegram_limits, 'telegram_url': base_url}
+            for scenario in ('cold',) if args.no_warm else ('cold', 'warm'):
+                state.reset()
+                result = run_child(options, verbose=args.verbose)
+                result.update(scenario=scenario, repeat=n, server=state.snapshot())
+                runs.append(result)
+                print(f"   #{n + 1} {scenario:<5} {result['phases']['total']:.2f}s  "
+                      f"{result['items']} itens  {state.snapshot()['feed_requests']} GETs")
+    server.shutdown()
+
+    summary = summarize(runs)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f).get('summary')
+    print_report(summary, baseline)
+
+    commit = _git_commit()
+    report = {
+        'commit': commit,
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'cpus': os.cpu_count()},
+        'args': {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()
+                 if k != 'child'},
+        'summary': summary,
+        'runs': runs,
+    }
+    output = args.output or RESULTS_DIR / f"{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos engines de resumo (Sumy LSA x TextRank/NumPy)
+===========================================================
+Usa os resumos já guardados em history.json como textos de entrada,
+agrupados por feed (como o process_feed faz) e no idioma do feed.
+
+Uso:
+    python benchmarks/bench_summarizer.py              # 5 repetições
+    python benchmarks/bench_summarizer.py --repeat 20
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.config import Config
+from src import processor
+
+
+def load_batches():
+    """{(feed, idioma): [textos]} a partir do history.json."""
+    languages = {f.get('name'): f.get('language', 'en') for f in Config.load_feeds()}
+    with open(Config.HISTORY_FILE, 'r', encoding='utf-8') as f:
+        history = json.load(f)
+
+    batches = defaultdict(list)
+    for item in history:
+        if not isinstance(item, dict):
+            continue
+        text = processor.clean_html(item.get('summary', ''))
+        if len(text.split()) < 20:  # mesmo corte do summarize_many
+            continue
+        source = item.get('source', '')
+        batches[(source, languages.get(source, 'en'))].append(text)
+    return batches
+
+
+def bench_sumy(batches, sentences):
+    for (_, lang), texts in batches.items():
+        for text in texts:
+            processor._summarize_sumy(text, lang, sentences)
+
+
+def bench_textrank(batches, sentences):
+    for (_, lang), texts in batches.items():
+        processor._summarize_textrank(texts, lang, sentences)
+
+
+def run(name, func, batches, sentences, repeat):
+    try:
+        func(batches, sentences)  # aquecimento (carrega tokenizers/stopwords)
+    except Exception as e:
+        print(f"{name:<10} indisponível: {e.__class__.__name__}: {str(e).splitlines()[0]}")
+        return None
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(batches, sentences)
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    total = sum(len(t) for t in batches.values())
+    print(f"{name:<10} melhor {best * 1000:8.1f} ms  "
+          f"média {sum(times) / len(times) * 1000:8.1f} ms  "
+          f"{best / total * 1000:6.2f} ms/texto")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Sumy x TextRank")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--sentences', type=int, default=Config.MAX_SUMMARY_SENTENCES)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    batches = load_batches()
+    total = sum(len(t) for t in batches.values())
+    print(f"{total} textos em {len(batches)} feeds, {args.sentences} frases, {args.repeat} repetições\n")
+
+    sumy = run('sumy', bench_sumy, batches, args.sentences, args.repeat)
+    textrank = None
+    if processor._get_numpy() is None:
+        print("textrank   indisponível: NumPy não instalado")
+    else:
+        textrank = run('textrank', bench_textrank, batches, args.sentences, args.repeat)
+
+    if sumy and textrank:
+        print(f"\nTextRank {sumy / textrank:.1f}x mais rápido que Sumy")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Fixtures RSS do benchmark end-to-end
+====================================
+Um arquivo por feed do feeds_config.json em benchmarks/fixtures/feeds/,
+mais o índice benchmarks/fixtures/feeds.json (nome, idioma, arquivo, URL).
+
+Sem --record os feeds são gerados de forma determinística, imitando o
+formato de cada fonte (RSS 0.91 da Folha, WordPress com content:encoded,
+portais com media:thumbnail, newsrooms com textos longos) e o ritmo de
+publicação. Com --record o conteúdo real é baixado das URLs originais.
+
+Uso:
+    python benchmarks/feed_fixtures.py            # regenera as fixtures sintéticas
+    python benchmarks/feed_fixtures.py --record   # grava os feeds reais
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.config import Config
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+FEEDS_DIR = FIXTURES_DIR / "feeds"
+INDEX_FILE = FIXTURES_DIR / "feeds.json"
+
+# Data fixa: as fixtures não mudam entre regenerações
+BASE_TIME = datetime(2026, 10, 1, 12, 0, tzinfo=timezone.utc)
+
+# nome → (estilo, nº de itens, minutos entre publicações)
+FEED_SHAPES = {
+    'Folha de S.Paulo': ('rss091', 60, 12),
+    'Nintendo': ('newsroom', 20, 2 * 1440),
+    'IBM': ('newsroom', 25, 3 * 1440),
+    'BBC News': ('portal', 45, 20),
+    'Pitchfork': ('portal', 30, 90),
+    'Metal Injection': ('wordpress', 15, 120),
+    'Irish Independent': ('portal', 80, 10),
+    'Hot Press (Ireland)': ('wordpress', 10, 360),
+    'The Guardian UK': ('portal', 100, 8),
+    'The Guardian US': ('portal', 100, 10),
+    'The Guardian Tech': ('portal', 60, 60),
+    'Tenho Mais Discos Que Amigos (Brasil)': ('wordpress', 10, 240),
+    'MusicRadar (UK)': ('portal', 50, 45),
+    'NME Music (UK)': ('wordpress', 10, 90),
+    'Rolling Stone Music (US)': ('wordpress', 10, 60),
+    'GoldenPlec (Ireland Music)': ('wordpress', 10, 300),
+    'Consequence of Sound (US)': ('wordpress', 10, 45),
+}
+
+WORDS = {
+    'en': ("government announces new plan for energy prices after week of talks with unions "
+           "band releases surprise album ahead of world tour dates in europe and north america "
+           "researchers warn that rising temperatures could affect crops across the region "
+           "company reports record quarterly profit as demand for cloud services grows "
+           "police investigate incident in city centre while witnesses describe chaos "
+           "festival confirms headliners for next summer with tickets on sale friday "
+           "minister says the economy will recover faster than expected despite inflation "
+           "new game console update brings performance improvements and online features "
+           "singer opens up about recording sessions and the influence of early punk records "
+           "court rules on landmark case over data privacy and artificial intelligence").split(),
+    'pt': ("governo anuncia novo plano para conter preços da energia após semana de reuniões "
+           "banda lança disco surpresa antes da turnê por capitais do brasil e da europa "
+           "pesquisadores alertam que o calor pode afetar safras em todo o país neste ano "
+           "empresa registra lucro recorde no trimestre com alta na demanda por serviços "
+           "polícia investiga ocorrência no centro enquanto testemunhas relatam confusão "
+           "festival confirma atrações do próximo verão e ingressos começam a ser vendidos "
+           "ministro afirma que a economia vai crescer mais rápido do que o esperado "
+           "cantora fala sobre gravações do novo álbum e a influência do rock nacional "
+           "tribunal decide caso sobre privacidade de dados e inteligência artificial").split(),
+}
+
+
+def slugify(name):
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def _rng(seed):
+    return random.Random(int(hashlib.sha256(seed.encode('utf-8')).hexdigest()[:16], 16))
+
+
+def _sentence(rng, words, low=8, high=18):
+    text = " ".join(rng.choice(words) for _ in range(rng.randint(low, high)))
+    return text[0].upper() + text[1:] + "."
+
+
+def _title(rng, words, index):
+    text = " ".join(rng.choice(words) for _ in range(rng.randint(6, 11)))
+    return f"{text[0].upper()}{text[1:]} ({index})"
+
+
+def generate_feed(name, language='en', style='portal', items=30, gap_minutes=60, seed=None):
+    """RSS determinístico no formato `style` ('rss091', 'portal', 'wordpress', 'newsroom')."""
+    rng = _rng(seed or name)
+    words = WORDS.get(language, WORDS['en'])
+    slug = slugify(name)
+    namespaces = ''
+    if style == 'wordpress':
+        namespaces = (' xmlns:content="http://purl.org/rss/1.0/modules/content/"'
+                      ' xmlns:dc="http://purl.org/dc/elements/1.1/"')
+    elif style == 'portal':
+        namespaces = ' xmlns:media="http://search.yahoo.com/mrss/"'
+    version = '0.91' if style == 'rss091' else '2.0'
+
+    out = [f'<?xml version="1.0" encoding="UTF-8"?>\n<rss version="{version}"{namespaces}>\n<channel>\n'
+           f'<title>{escape(name)}</title>\n<link>https://{slug}.example/</link>\n'
+           f'<description>{escape(name)} (fixture)</description>\n'
+           f'<language>{"pt-br" if language == "pt" else "en"}</language>\n']
+    for i in range(items):
+        published = BASE_TIME - timedelta(minutes=gap_minutes * i * rng.uniform(0.5, 1.5))
+        title = _title(rng, words, i)
+        link = f"https://{slug}.example/{published:%Y/%m/%d}/{i}"
+        paragraphs = {'rss091': 1, 'portal': 2, 'newsroom': 8, 'wordpress': 3}[style]
+        summary = " ".join(_sentence(rng, words) for _ in range(paragraphs))
+        out.append(f'<item>\n<title>{escape(title)}</title>\n<link>{link}</link>\n'
+                   f'<guid>{link}</guid>\n<pubDate>{format_datetime(published)}</pubDate>\n')
+        if style == 'wordpress':
+            body = "".join(f"<p>{_sentence(rng, words, 15, 30)} {_sentence(rng, words, 15, 30)}</p>"
+                           for _ in range(rng.randint(6, 12)))
+            out.append(f'<dc:creator><![CDATA[Redação]]></dc:creator>\n'
+                       f'<category><![CDATA[{rng.choice(words).title()}]]></category>\n'
+                       f'<description><![CDATA[<p>{summary}</p>]]></description>\n'
+                       f'<content:encoded><![CDATA[{body}]]></content:encoded>\n')
+        elif style == 'portal':
+            out.append(f'<description>{escape(summary)}</description>\n'
+                       f'<media:thumbnail width="240" height="135" url="https://img.{slug}.example/{i}.jpg"/>\n')
+        else:
+            out.append(f'<description>{escape("<p>" + summary + "</p>")}</description>\n')
+        out.append('</item>\n')
+    out.append('</channel>\n</rss>\n')
+    return "".join(out).encode('utf-8')
+
+
+def _record(url):
+    request = urllib.request.Request(url, headers={'User-Agent': Config.USER_AGENT})
+    with urllib.request.urlopen(request, timeout=Config.DOWNLOAD_TIMEOUT) as resp:
+        return resp.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera/grava as fixtures RSS do benchmark")
+    parser.add_argument('--record', action='store_true',
+                        help='Baixa os feeds reais em vez de gerar')
+    args = parser.parse_args()
+
+    FEEDS_DIR.mkdir(parents=True, exist_ok=True)
+    index = []
+    for feed in Config.load_feeds():
+        name = feed.get('name', feed['url'])
+        language = feed.get('language', 'en')
+        style, items, gap = FEED_SHAPES.get(name, ('portal', 30, 60))
+        filename = f"{slugify(name)}.xml"
+        if args.record:
+            try:
+                body = _record(feed['url'])
+            except Exception as e:
+                print(f"⚠️  {name}: {e}; mantendo a fixture atual")
+                body = None
+        else:
+            body = generate_feed(name, language, style, items, gap)
+        if body:
+            (FEEDS_DIR / filename).write_bytes(body)
+        index.append({'name': name, 'language': language, 'file': filename, 'url': feed['url']})
+        size = (FEEDS_DIR / filename).stat().st_size if (FEEDS_DIR / filename).exists() else 0
+        print(f"{filename:<45} {size // 1024:>5}KB")
+
+    with open(INDEX_FILE, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,124 +11,135 @@ Uso:
     python main.py                    # Execução normal
     python main.py --feed 0           # Processa apenas o feed 0
     python main.py --dry-run          # Apenas coleta e mostra, sem enviar
+    python main.py --force            # Ignora ETag/Last-Modified e baixa tudo
+    python main.py --daemon           # Residente, cada feed no seu ritmo de publicação
+    python main.py --status           # Agenda de polling (ritmo estimado por feed)
+    python main.py --startup-profile  # Tempo de import por pacote (orçamento de cold start)
+    python main.py --profile=mem      # cProfile (cpu, padrão) / tracemalloc (mem) por feed
 """
 
 import argparse
 import gc
-import json
 import logging
+import os
+import signal
 import sys
+import threading
 import time
 from datetime import datetime
 
 from src.config import Config
-from src.collector import collect_feed_data
-from src.processor import summarize_content, clean_html
-from src.audio import generate_audio_file
-from src.notifier import send_telegram_audio, send_telegram_message
+from src.collector import collect_feed_data, commit_validators, get_connection_stats, save_feed_cache
+from src.processor import summarize_many, summary_cache
+from src.dedupe import DedupeIndex
+from src.history import HistoryStore
+from src.audio import generate_episode_audio, get_encode_stats
+from src.audio_cache import audio_cache
+from src.notifier import (broadcast_audio, broadcast_message, send_telegram_message,
+                          get_upload_stats, get_delivery_stats, flush_outbox, outbox_paths)
+from src.metrics import counter, gauge, registry, timed
+from src.pipeline import Pipeline, Stage
+from src.scheduler import FeedScheduler, feed_rates
 
 logger = logging.getLogger(__name__)
 
+_items = counter('newsbot_items_total', "Notícias coletadas por feed e resultado (nova/duplicada)")
+
 # ─── Histórico ─────────────────────────────────────────────────────────────
 
-def load_history():
-    if Config.HISTORY_FILE.exists():
-        try:
-            with open(Config.HISTORY_FILE, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, OSError):
-            return []
-    return []
-
-def save_history(history):
-    history = history[-Config.MAX_HISTORY:]
-    Config.HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(Config.HISTORY_FILE, 'w') as f:
-        json.dump(history, f, ensure_ascii=False)
-
-def is_duplicate(title, history):
-    clean = clean_html(title).strip().lower()[:80]
-    for h in history:
-        h_title = h if isinstance(h, str) else h.get('title', '')
-        if clean in h_title.lower() or h_title.lower() in clean:
-            return True
-    return False
-
-# ─── Limpeza ───────────────────────────────────────────────────────────────
-
-def cleanup_old_audio():
-    import time as t
-    now = t.time()
-    cutoff = now - (Config.RETENTION_DAYS * 86400)
-    removed = 0
-    for f in Config.AUDIO_DIR.glob("*.wav"):
-        if f.stat().st_mtime < cutoff:
-            f.unlink(missing_ok=True)
-            removed += 1
-    if removed:
-        logger.info(f"🧹 {removed} áudios antigos removidos.")
+def load_dedupe_index(store):
+    """Índice de duplicatas com os últimos Config.DEDUPE_MAX_TITLES títulos do histórico."""
+    index = DedupeIndex(store.titles(Config.DEDUPE_MAX_TITLES))
+    logger.info(f"🔎 Índice de duplicatas: {len(index)} títulos")
+    return index
+
+
+def save_history(store, records):
+    """Grava as notícias novas no SQLite e exporta history.json para o portfolio."""
+    store.add_many(records)
+    store.prune(Config.DEDUPE_MAX_TITLES)
+    store.export_json()
 
 # ─── Processamento do feed ─────────────────────────────────────────────────
+# Cada etapa é uma função separada para poder rodar como estágio do pipeline
+# (src/pipeline.py): fetch → prepare (dedupe + resumo) → tts → deliver.
+# process_feed() encadeia as mesmas etapas de forma sequencial.
+
+def _feed_name(feed_config):
+    url = feed_config.get('url')
+    return feed_config.get('name', url.split('/')[2] if '/' in url else url)
 
-def process_feed(feed_config, dry_run=False):
+
+def _history_records(new_items):
+    return [{'title': t, 'summary': s, 'link': l, 'source': src, 'date': pub.isoformat() if hasattr(pub, 'isoformat') else str(pub), 'image': img} for t, s, l, src, pub, img in new_items]
+
+
+def prepare_feed(feed_config, news_items, seen, store=None):
     """
-    Processa um feed RSS:
-      1. Coleta notícias
-      2. Filtra duplicatas
-      3. Gera:
-         - Texto CURTO para áudio (só headlines)
-         - Texto LONGO para Telegram (resumo + links)
-      4. Gera áudio (edge-tts para PT, Piper para EN)
-      5. Envia para Telegram: áudio + mensagem com resumo completo
+    Etapas 2 e 3: filtra duplicatas, resume e monta os textos.
+
+    Returns:
+        Episódio (dict) pronto para TTS/envio, ou None se não há nada novo
     """
-    url = feed_config.get('url')
     lang = feed_config.get('language', 'en')
-    name = feed_config.get('name', url.split('/')[2] if '/' in url else url)
+    name = _feed_name(feed_config)
 
     logger.info(f"📰 Processando: {name} ({lang})")
-    history = load_history()
 
-    # 1. Coleta
-    news_items = collect_feed_data(url, limit=Config.MAX_ITEMS_PER_FEED)
     if not news_items:
         logger.info(f"⏭️  {name}: sem notícias")
-        return []
+        return None
+
+    # 2. Filtra duplicatas
+    fresh = []
+    with timed('dedupe'):
+        for item in news_items:
+            title = item['title']
+            # O índice em memória só guarda os últimos DEDUPE_MAX_TITLES; o
+            # SQLite pega repetições exatas (título ou link) mais antigas
+            if seen.is_duplicate(title) or (store and (store.has_link(item.get('link', ''))
+                                                       or store.has_title(title))):
+                logger.info(f"⏭️  Já vista: {title[:60]}...")
+                continue
+            # Entra no índice já nesta execução (mesma notícia em feeds diferentes)
+            seen.add(title)
+            fresh.append(item)
+    _items.inc(len(fresh), feed=name, result='new')
+    _items.inc(len(news_items) - len(fresh), feed=name, result='duplicate')
+
+    # Resume todas as notícias novas do feed numa chamada só
+    with timed('summarize'):
+        summaries = summarize_many([item.get('raw_summary', '') for item in fresh], language=lang)
 
-    # 2. Processa cada notícia
     new_items = []  # (title, summary, link, source, published, image)
-    for item in news_items:
+    for item, summary in zip(fresh, summaries):
         title = item['title']
-        raw = item.get('raw_summary', '')
         link = item.get('link', '')
         published = item.get('published_at', datetime.now())
         image = item.get('image', '')
         source = name
-
-        if is_duplicate(title, history):
-            logger.info(f"⏭️  Já vista: {title[:60]}...")
-            continue
-
-        summary = summarize_content(raw, language=lang)
         new_items.append((title, summary, link, source, published, image))
         logger.info(f"📖 + {title[:70]}...")
 
     if not new_items:
         logger.info(f"✅ {name}: nada novo.")
-        return []
+        return None
 
     logger.info(f"📝 {name}: {len(new_items)} notícia(s) nova(s)")
 
-    # ─── 3a. Texto para ÁUDIO (só headlines, curto) ───────────────
-    if lang == 'pt':
-        audio_text = f"Notícias de {name}.\n\n"
-        audio_text += "\\n".join(f"{i}. {t}" for i, (t, s, l, src, pub, img) in enumerate(new_items, 1))
-    else:
-        audio_text = f"News from {name}.\\n\\n"
-        audio_text += "\\n".join(f"{i}. {t}" for i, (t, s, l, src, pub, img) in enumerate(new_items, 1))
-
-    # Limita tamanho do áudio a ~2000 chars (cabe em ~1min)
-    if len(audio_text) > Config.MAX_AUDIO_CHARS:
-        audio_text = audio_text[:Config.MAX_AUDIO_CHARS] + "..."
+    # ─── 3a. Segmentos para ÁUDIO (só headlines, curto) ──────────
+    # Abertura, número e manchete são segmentos separados: cada um fica no
+    # cache de áudio pelo próprio texto, então só manchetes novas vão ao TTS.
+    intro = f"Notícias de {name}." if lang == 'pt' else f"News from {name}."
+    audio_segments = [intro]
+    total_chars = len(intro)
+    for i, (t, s, l, src, pub, img) in enumerate(new_items, 1):
+        # Limita tamanho do áudio a ~Config.MAX_AUDIO_CHARS (cabe em ~1min)
+        if total_chars + len(t) > Config.MAX_AUDIO_CHARS:
+            break
+        audio_segments += [f"{i}.", t]
+        total_chars += len(t) + 3
+    audio_text = "\n".join(audio_segments)
 
     # ─── 3b. Texto para TELEGRAM (resumo completo, maior) ──────────
     if lang == 'pt':
@@ -161,42 +172,405 @@ def process_feed(feed_config, dry_run=False):
     if len(caption_for_audio) > 1000:
         caption_for_audio = msg[:997] + "..."
 
+    return {
+        'name': name,
+        'url': feed_config.get('url'),
+        'lang': lang,
+        'new_items': new_items,
+        'audio_text': audio_text,
+        'audio_segments': audio_segments,
+        'msg': msg,
+        'caption': caption_for_audio,
+        'audio_path': None,
+        'chats': feed_config.get('chats') or [],
+    }
+
+
+def synthesize_episode(episode):
+    """Etapa 4: gera áudio (só headlines)."""
+    safe_name = "".join(c if c.isalnum() else "_" for c in episode['name'])[:30]
+    audio_file = f"{safe_name}_{datetime.now():%Y%m%d}"
+    with timed('tts'):
+        audio_path = generate_episode_audio(episode['audio_segments'], audio_file,
+                                            language=episode['lang'])
+    episode['audio_path'] = audio_path
+    if audio_path:
+        # Nome amigável para o Telegram (o arquivo em cache se chama <hash>.<ext>)
+        episode['audio_name'] = audio_file + os.path.splitext(audio_path)[1]
+    return episode
+
+
+def deliver_episode(episode, dry_run=False):
+    """
+    Etapa 5: envia para Telegram (áudio + mensagem com resumo completo).
+
+    Returns:
+        Registros para o histórico
+    """
+    with timed('deliver'):
+        return _deliver_episode(episode, dry_run)
+
+
+def _deliver_episode(episode, dry_run):
+    name, msg = episode['name'], episode['msg']
+    new_items = episode['new_items']
+
     if dry_run:
         logger.info(f"🔍 [DRY-RUN] {name}")
-        logger.info(f"    Áudio ({len(audio_text)} chars): {audio_text[:150]}...")
+        logger.info(f"    Áudio ({len(episode['audio_text'])} chars): {episode['audio_text'][:150]}...")
         logger.info(f"    Mensagem ({len(msg)} chars): {len(new_items)} notícias")
-        return [{'title': t, 'summary': s, 'link': l, 'source': src, 'date': pub.isoformat() if hasattr(pub, 'isoformat') else str(pub), 'image': img} for t, s, l, src, pub, img in new_items]
-
-    # ─── 4. Gera áudio (só headlines) ──────────────────────────────
-    safe_name = "".join(c if c.isalnum() else "_" for c in name)[:30]
-    audio_file = f"{safe_name}_{datetime.now():%Y%m%d}.wav"
-    audio_path = generate_audio_file(audio_text, audio_file, language=lang)
-
-    # ─── 5. Envia para Telegram ────────────────────────────────────
+        logger.info(f"    Destinos: {', '.join(map(str, episode['chats']))}")
+        return _history_records(new_items)
+
+    # Um áudio só para todos os destinos: upload no primeiro, file_id nos demais
+    chats = episode['chats']
+    if not chats:
+        logger.warning(f"⚠️  {name}: nenhum chat de destino (defina CHAT_ID ou routes), envio pulado")
+        return _history_records(new_items)
+    audio_path = episode['audio_path']
     if audio_path:
         # Áudio + legenda curta (headlines)
-        sent = send_telegram_audio(audio_path, caption_for_audio)
+        results = broadcast_audio(audio_path, episode['caption'], chats,
+                                  filename=episode.get('audio_name'))
+        sent = [chat for chat, ok in results.items() if ok]
+        failed = [chat for chat, ok in results.items() if not ok]
         if sent:
-            logger.info(f"✅ {name}: áudio enviado!")
-        else:
-            logger.warning(f"⚠️  {name}: áudio não enviado")
+            logger.info(f"✅ {name}: áudio enviado para {len(sent)}/{len(chats)} chat(s)!")
+        if failed:
+            logger.warning(f"⚠️  {name}: áudio não enviado para {', '.join(map(str, failed))}")
             # Fallback: envia só texto
             if len(msg) > 1000:
-                send_telegram_message(msg[:4000])
-            return [{'title': t, 'summary': s, 'link': l, 'source': src, 'date': pub.isoformat() if hasattr(pub, 'isoformat') else str(pub), 'image': img} for t, s, l, src, pub, img in new_items]
+                broadcast_message(msg[:4000], failed)
+        if not sent:
+            return _history_records(new_items)
     else:
         logger.warning(f"⚠️  {name}: sem áudio, enviando só texto")
         if len(msg) > 1000:
-            send_telegram_message(msg[:4000])
-        return [{'title': t, 'summary': s, 'link': l, 'source': src, 'date': pub.isoformat() if hasattr(pub, 'isoformat') else str(pub), 'image': img} for t, s, l, src, pub, img in new_items]
+            broadcast_message(msg[:4000], chats)
+        return _history_records(new_items)
 
     # Se a mensagem for maior que 1000 chars, envia o texto completo separadamente
     if len(msg) > 1000 and len(msg) <= 4000:
         # Envia o texto completo como mensagem de texto
-        send_telegram_message(msg)
+        broadcast_message(msg, sent)
         logger.info(f"📝 {name}: texto completo enviado ({len(msg)} chars)")
 
-    return [{'title': t, 'summary': s, 'link': l, 'source': src, 'date': pub.isoformat() if hasattr(pub, 'isoformat') else str(pub), 'image': img} for t, s, l, src, pub, img in new_items]
+    return _history_records(new_items)
+
+
+def process_feed(feed_config, dry_run=False, news_items=None, seen=None, store=None, use_cache=True):
+    """
+    Processa um feed RSS de forma sequencial:
+      1. Coleta notícias (ou usa news_items já coletados)
+      2. Filtra duplicatas
+      3. Gera:
+         - Texto CURTO para áudio (só headlines)
+         - Texto LONGO para Telegram (resumo + links)
+      4. Gera áudio (edge-tts para PT, Piper para EN)
+      5. Envia para Telegram: áudio + mensagem com resumo completo
+    """
+    if news_items is None:
+        with timed('fetch'):
+            news_items = collect_feed_data(feed_config.get('url'), limit=Config.MAX_ITEMS_PER_FEED,
+                                           use_cache=use_cache)
+        feed_rates.observe(feed_config.get('url'), news_items)
+    if store is None:
+        store = HistoryStore()
+    if seen is None:
+        seen = load_dedupe_index(store)
+
+    episode = prepare_feed(feed_config, news_items, seen, store)
+    if episode is None:
+        commit_validators(feed_config.get('url'))
+        return []
+    if not dry_run:
+        synthesize_episode(episode)
+    records = deliver_episode(episode, dry_run=dry_run)
+    commit_validators(feed_config.get('url'))
+    return records
+
+
+def build_pipeline(seen, store, dry_run=False, use_cache=True):
+    """
+    Monta o pipeline fetch → prepare → tts → deliver.
+
+    Cada item que entra é um feed_config; cada saída é a lista de registros
+    de histórico do feed. Enquanto o feed N+1 é resumido, o N gera áudio
+    e o N-1 está sendo enviado.
+    """
+    delivered = [0]
+
+    def fetch(feed_config):
+        with timed('fetch'):
+            news_items = collect_feed_data(feed_config.get('url'),
+                                           limit=Config.MAX_ITEMS_PER_FEED,
+                                           use_cache=use_cache)
+        feed_rates.observe(feed_config.get('url'), news_items)
+        return (feed_config, news_items)
+
+    def prepare(job):
+        feed_config, news_items = job
+        episode = prepare_feed(feed_config, news_items, seen, store)
+        if episode is None:
+            # Nada novo: o feed terminou aqui
+            commit_validators(feed_config.get('url'))
+        return episode
+
+    def tts(episode):
+        return episode if dry_run else synthesize_episode(episode)
+
+    def deliver(episode):
+        # Sem pausa fixa: o notifier segura o ritmo (token bucket + 429)
+        records = deliver_episode(episode, dry_run=dry_run)
+        # Entregue (ou no outbox): só agora o 304/hash pode pular esse conteúdo
+        commit_validators(episode['url'])
+        # Garbage collection periódico para não acumular memória
+        delivered[0] += 1
+        if delivered[0] % Config.GC_INTERVAL == 0:
+            collected = gc.collect()
+            logger.debug(f"🧹 GC: {collected} objetos coletados após {delivered[0]} feeds")
+        return records
+
+    size = Config.PIPELINE_QUEUE_SIZE
+    return Pipeline([
+        Stage('fetch', fetch, workers=Config.FETCH_WORKERS, queue_size=Config.FETCH_WORKERS),
+        Stage('prepare', prepare, workers=Config.SUMMARY_WORKERS, queue_size=size),
+        Stage('tts', tts, workers=Config.TTS_WORKERS, queue_size=size),
+        Stage('deliver', deliver, workers=Config.DELIVERY_WORKERS, queue_size=size),
+    ])
+
+
+def log_audio_summary():
+    """Comparativo de tamanho (formato comprimido x WAV) e tempo de upload."""
+    enc = get_encode_stats()
+    if enc['files'] and enc['wav_bytes']:
+        saved = 1 - enc['bytes'] / enc['wav_bytes']
+        logger.info(f"🗜️  Áudio {Config.AUDIO_FORMAT}: {enc['files']} arquivos, {enc['bytes']//1024}KB "
+                    f"(WAV seria {enc['wav_bytes']//1024}KB, {saved:.0%} menor), "
+                    f"codificação {enc['seconds']:.1f}s")
+    up = get_upload_stats()
+    if up['files'] and up['seconds']:
+        rate = up['bytes'] / 1024 / up['seconds']
+        wav_estimate = ""
+        if enc['bytes'] and enc['wav_bytes']:
+            wav_estimate = f" (como WAV: ~{up['seconds'] * enc['wav_bytes'] / enc['bytes']:.1f}s)"
+        logger.info(f"📤 Upload: {up['files']} áudios, {up['bytes']//1024}KB em {up['seconds']:.1f}s "
+                    f"({rate:.0f}KB/s){wav_estimate}")
+    if up['reused']:
+        logger.info(f"♻️  Reenvio por file_id: {up['reused']} áudios, {up['bytes_saved']//1024}KB sem upload")
+    for chat, st in sorted(get_delivery_stats().items()):
+        logger.info(f"📬 Chat {chat}: {st['sent']} envios, {st['failed']} falhas, "
+                    f"latência média {st['avg']:.1f}s (máx. {st['max']:.1f}s)")
+
+
+# ─── Execução ─────────────────────────────────────────────────────────────
+
+def run_batch(feeds, store, seen, dry_run=False, use_cache=True):
+    """Passa uma leva de feeds pelo pipeline. Returns registros de histórico."""
+    pipeline = build_pipeline(seen, store, dry_run=dry_run, use_cache=use_cache)
+    records = []
+    for feed_records in pipeline.run(feeds):
+        records.extend(feed_records)
+    pipeline.log_stats()
+    gauge('newsbot_pipeline_wall_seconds', "Duração da última leva do pipeline").set(pipeline.wall_seconds)
+    for st in pipeline.stats():
+        gauge('newsbot_pipeline_busy_seconds', "Tempo ocupado por estágio na última leva").set(
+            st['busy_seconds'], stage=st['stage'])
+        gauge('newsbot_pipeline_utilization', "Utilização por estágio na última leva").set(
+            st['utilization'], stage=st['stage'])
+    return records
+
+
+def run_profiled(feeds, store, seen, mode, dry_run=False, use_cache=True):
+    """
+    Execução sequencial (process_feed feed a feed) com cProfile/tracemalloc
+    em volta de cada feed; relatórios em logs/profile/<data>/.
+    """
+    from src.profiling import RunProfiler
+
+    profiler = RunProfiler(mode)
+    records = []
+    for feed in feeds:
+        with profiler.feed(_feed_name(feed)):
+            records.extend(process_feed(feed, dry_run=dry_run, seen=seen, store=store,
+                                        use_cache=use_cache))
+    profiler.write_summary()
+    return records
+
+
+def log_cache_summary():
+    """Só registra no log; quem grava os caches é persist_state."""
+    cache = summary_cache.stats()
+    audio = audio_cache.stats()
+    logger.info(f"🔊 Cache de áudio: {audio['hits']} hits / {audio['misses']} misses, "
+                f"{audio['bytes_served']//1024}KB reaproveitados, {audio['bytes_written']//1024}KB gerados, "
+                f"{audio['files']} arquivos ({audio['bytes_total']//(1024*1024)}MB)")
+    log_audio_summary()
+    logger.info(f"🗃️  Cache de resumos: {cache['hits']} hits / {cache['misses']} misses "
+                f"({cache['hit_rate']:.0%}), {cache['entries']} entradas")
+    http = get_connection_stats()
+    if http['requests']:
+        logger.info(f"🔌 Conexões: {http['requests']} requisições em {http['connections']} conexões "
+                    f"({http['reuse_rate']:.0%} reaproveitadas), DNS {http['dns_hits']} hits / "
+                    f"{http['dns_misses']} consultas")
+
+
+def write_run_metrics(started):
+    """
+    Junta as estatísticas dos módulos (caches, encode, upload, entrega) às
+    métricas da execução e grava JSON + textfile do Prometheus.
+    """
+    for name, stats in (('summary', summary_cache.stats()), ('audio', audio_cache.stats())):
+        for key in ('hits', 'misses', 'hit_rate'):
+            gauge(f'newsbot_cache_{key}', "Cache de resumos/áudio (acumulado no processo)").set(
+                stats[key], cache=name)
+    for key, value in get_encode_stats().items():
+        gauge('newsbot_encode', "Codificação de áudio (arquivos, bytes, wav_bytes, seconds)").set(value, stat=key)
+    for key, value in get_connection_stats().items():
+        gauge('newsbot_http', "Coleta: requests, connections, reused, reuse_rate, dns_hits, dns_misses "
+                              "(acumulado no processo)").set(value, stat=key)
+    for key, value in get_upload_stats().items():
+        gauge('newsbot_upload', "Upload ao Telegram (files, bytes, seconds, reused, bytes_saved)").set(value, stat=key)
+    for chat, st in get_delivery_stats().items():
+        gauge('newsbot_delivery_latency_seconds', "Latência média de entrega por chat").set(st['avg'], chat=chat)
+        gauge('newsbot_delivery_failures', "Falhas de entrega por chat").set(st['failed'], chat=chat)
+    gauge('newsbot_run_duration_seconds', "Duração da execução (ou da última leva do daemon)").set(
+        time.time() - started)
+    gauge('newsbot_last_run_timestamp_seconds', "Fim da última execução").set(time.time())
+    try:
+        registry.write()
+    except OSError as e:
+        logger.warning(f"⚠️  Não foi possível gravar as métricas: {e}")
+
+
+def persist_state(store, records, dry_run=False):
+    """Grava caches, validadores HTTP e histórico depois de uma leva."""
+    summary_cache.save()
+    audio_cache.save()
+    feed_rates.save()
+    # Validadores só são persistidos em execução real (dry-run não consome o feed),
+    # e só os dos feeds que chegaram ao fim do pipeline (commit_validators)
+    if not dry_run:
+        save_feed_cache()
+
+    # Histórico (dry-run não consome as notícias)
+    if records and not dry_run:
+        save_history(store, records)
+        logger.info(f"💾 Histórico: {len(records)} novos títulos")
+
+
+def housekeeping(dry_run=False):
+    """Reenvio do outbox e limpeza do cache de áudio (início e manutenção do daemon)."""
+    if not dry_run:
+        delivered = flush_outbox()
+        if delivered:
+            logger.info(f"📮 Outbox: {delivered} envio(s) pendente(s) entregue(s)")
+
+    # O que continua no outbox ainda precisa do arquivo
+    if audio_cache.evict(keep=outbox_paths()):
+        audio_cache.save()  # O daemon pode encerrar antes da próxima leva gravar o índice
+
+
+def select_feeds(feed_index=None):
+    feeds = Config.load_feeds()
+    return [feed for idx, feed in enumerate(feeds) if feed_index is None or idx == feed_index]
+
+
+def _config_mtime():
+    try:
+        return Config.CONFIG_FILE.stat().st_mtime
+    except OSError:
+        return None
+
+
+def print_status(feed_index=None):
+    """Agenda de polling: modo, ritmo estimado e próxima consulta de cada feed."""
+    scheduler = FeedScheduler(select_feeds(feed_index), rates=feed_rates)
+    now = time.time()
+
+    def duration(seconds):
+        minutes = abs(seconds) / 60
+        if minutes >= 48 * 60:
+            return f"{minutes/1440:.1f}d"
+        return f"{minutes/60:.1f}h" if minutes >= 90 else f"{minutes:.0f}min"
+
+    def relative(ts):
+        if not ts:
+            return '-'
+        return f"em {duration(ts - now)}" if ts > now else f"há {duration(now - ts)}"
+
+    print(f"{'Feed':<28} {'Modo':<11} {'Publica a cada':>14} {'Intervalo':>10} "
+          f"{'Pollings':>8}  {'Último':<10} {'Próximo':<10}")
+    for feed, when in scheduler.schedule():
+        stats = feed_rates.get(feed['url'])
+        gap = feed_rates.mean_gap(feed['url'])
+        print(f"{_feed_name(feed)[:28]:<28} {scheduler.mode(feed, now):<11} "
+              f"{(duration(gap) if gap else '-'):>14} {duration(scheduler.interval(feed, now)):>10} "
+              f"{stats.get('polls', 0):>8}  {relative(stats.get('last_poll')):<10} "
+              f"{'agora' if when <= now else relative(when):<10}")
+
+
+def run_daemon(args):
+    """
+    Modo residente: cada feed é consultado no próprio intervalo e o processo
+    fica vivo entre as consultas, mantendo quentes os sumarizadores, o worker
+    do Piper, o loop do Edge-TTS e as sessões HTTP. feeds_config.json é
+    recarregado quando muda. SIGTERM/SIGINT terminam a leva atual e saem.
+    """
+    store = HistoryStore()
+    seen = load_dedupe_index(store)
+    scheduler = FeedScheduler(select_feeds(args.feed), rates=feed_rates)
+    if not len(scheduler):
+        logger.error("❌ Nenhum feed configurado")
+        sys.exit(1)
+    logger.info(f"🛰️  Daemon: {len(scheduler)} feeds agendados")
+
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+
+    config_mtime = _config_mtime()
+    maintenance_every = Config.DAEMON_MAINTENANCE_HOURS * 3600
+    next_maintenance = time.time() + maintenance_every
+    use_cache = not args.force
+
+    while not stop.is_set():
+        mtime = _config_mtime()
+        if mtime != config_mtime:
+            config_mtime = mtime
+            scheduler.update(select_feeds(args.feed))
+            logger.info(f"🔁 feeds_config.json recarregado: {len(scheduler)} feeds")
+
+        due = scheduler.due()
+        if due:
+            logger.info(f"⏰ {len(due)} feed(s) na vez: {', '.join(_feed_name(f) for f in due)}")
+            started = time.time()
+            records = []
+            try:
+                records = run_batch(due, store, seen, dry_run=args.dry_run, use_cache=use_cache)
+            except Exception as e:
+                logger.error(f"❌ Erro na leva do daemon: {e}")
+            use_cache = True
+            for feed in due:
+                scheduler.reschedule(feed)
+            persist_state(store, records, dry_run=args.dry_run)
+            write_run_metrics(started)
+
+        if time.time() >= next_maintenance:
+            next_maintenance = time.time() + maintenance_every
+            housekeeping(dry_run=args.dry_run)
+            log_cache_summary()
+            # Reconstrói o índice a partir do banco (já podado), limitando a memória
+            seen = load_dedupe_index(store)
+            gc.collect()
+
+        # Acorda pelo menos a cada minuto para notar mudanças no feeds_config.json
+        wait = scheduler.seconds_until_next()
+        stop.wait(60 if wait is None else min(wait, 60))
+
+    logger.info("🛑 Daemon encerrado")
+    log_cache_summary()
+    store.close()
 
 
 # ─── Main ─────────────────────────────────────────────────────────────────
@@ -207,12 +581,39 @@ def main():
                         help='Processar apenas um feed (índice)')
     parser.add_argument('--dry-run', action='store_true',
                         help='Apenas simular')
+    parser.add_argument('--force', action='store_true',
+                        help='Ignora o cache de GET condicional e baixa todos os feeds')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Fica residente e consulta cada feed no seu ritmo')
+    parser.add_argument('--status', action='store_true',
+                        help='Mostra a agenda de polling de cada feed e sai')
+    parser.add_argument('--profile', nargs='?', const='cpu', choices=('cpu', 'mem', 'all'),
+                        help='Processa os feeds em sequência com cProfile (cpu) e/ou '
+                             'tracemalloc (mem); relatórios em logs/profile/. O cProfile só '
+                             'vê a thread principal: TTS e envios em outras threads aparecem '
+                             'como espera')
+    parser.add_argument('--startup-profile', action='store_true',
+                        help='Mostra o tempo de import por pacote e sai (1 se passar do orçamento)')
     args = parser.parse_args()
 
-    Config.setup_folders()
+    if args.startup_profile:
+        from src.startup import print_startup_profile
+        sys.exit(0 if print_startup_profile() else 1)
+
+    started = time.time()
+    Config.setup()
+
+    if args.status:
+        print_status(args.feed)
+        return
+
     logger.info("🚀 News Collector v3.1 iniciado")
 
-    cleanup_old_audio()
+    housekeeping(dry_run=args.dry_run)
+
+    if args.daemon:
+        run_daemon(args)
+        return
 
     feeds = Config.load_feeds()
     if not feeds:
@@ -221,36 +622,38 @@ def main():
 
     logger.info(f"📚 {len(feeds)} feeds carregados")
 
-    all_new_titles = []
-    for idx, feed in enumerate(feeds):
-        if args.feed is not None and idx != args.feed:
-            continue
-        try:
-            new_titles = process_feed(feed, dry_run=args.dry_run)
-            all_new_titles.extend(new_titles)
-            if not args.dry_run and new_titles:
-                time.sleep(2)  # pausa reduzida de 3s para 2s
-            # Garbage collection periódico para não acumular memória
-            if idx > 0 and idx % Config.GC_INTERVAL == 0:
-                collected = gc.collect()
-                logger.debug(f"🧹 GC: {collected} objetos coletados após feed {idx}")
-        except Exception as e:
-            logger.error(f"❌ Erro no feed {idx}: {e}")
-            continue
-
-    # Histórico
-    if all_new_titles:
-        history = load_history()
-        history.extend(all_new_titles)
-        save_history(history)
-        logger.info(f"💾 Histórico: {len(all_new_titles)} novos títulos")
+    # Execução avulsa (cron/timer) segue a agenda do daemon: só os feeds
+    # vencidos, a não ser que --feed ou --force peçam explicitamente
+    selected = select_feeds(args.feed)
+    scheduler = FeedScheduler(selected, rates=feed_rates)
+    due = {scheduler.feed_key(feed) for feed in scheduler.due()}
+    batch = selected
+    if args.feed is None and not args.force:
+        batch = [feed for feed in selected if scheduler.feed_key(feed) in due]
+    skipped = len(selected) - len(batch)
+    if skipped:
+        logger.info(f"⏭️  {skipped} feed(s) fora da vez (ver --status)")
+
+    store = HistoryStore()
+    seen = load_dedupe_index(store)
+    if args.profile:
+        all_new_titles = run_profiled(batch, store, seen, args.profile,
+                                      dry_run=args.dry_run, use_cache=not args.force)
+    else:
+        all_new_titles = run_batch(batch, store, seen,
+                                   dry_run=args.dry_run, use_cache=not args.force)
+    for feed in batch:
+        scheduler.reschedule(feed)
+
+    log_cache_summary()
+    persist_state(store, all_new_titles, dry_run=args.dry_run)
+    store.close()
+    write_run_metrics(started)
 
     # Resumo final (só se enviou algo)
     if not args.dry_run and all_new_titles:
-        # Conta quantos feeds com notícias
-        feed_count = len([f for f in feeds if args.feed is None or f == feeds[args.feed]])
         summary = (f"✅ *NewsBot - Resumo do Dia*\n"
-                   f"📰 {len(all_new_titles)} notícias de {len(feeds)} feeds\n"
+                   f"📰 {len(all_new_titles)} notícias de {len(batch)} feeds\n"
                    f"⏰ {datetime.now():%d/%m/%Y %H:%M}")
         send_telegram_message(summary)
         logger.info(f"📊 Resumo enviado: {len(all_new_titles)} notícias")
@@ -1,10 +1,22 @@
 import asyncio
+import atexit
+import collections
+import json
 import logging
 import os
+import queue
+import shutil
 import subprocess
+import threading
+import time
+import uuid
+import wave
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from .audio_cache import audio_cache
 from .config import Config
+from .metrics import counter
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +33,70 @@ EDGE_VOICE_PT_ALT = "pt-BR-FranciscaNeural" # Feminina, natural
 # EN: fallback se Piper falhar
 EDGE_VOICE_EN = "en-US-ChristopherNeural"   # Masculina, americana
 
+# ─── Formatos de saída ────────────────────────────────────────────────────
+# Formato nativo de cada engine: Piper → WAV (PCM), Edge-TTS → MP3.
+# Os segmentos ficam em cache no nativo (um WAV pequeno por manchete); só
+# o episódio montado passa pelo ffmpeg, em streaming pelo stdin.
+NATIVE_FORMAT = {'piper': 'wav', 'edge': 'mp3'}
+FORMAT_EXT = {'wav': 'wav', 'mp3': 'mp3', 'opus': 'ogg'}
+_FFMPEG_CODEC = {
+    'opus': ['-c:a', 'libopus', '-b:a', '32k', '-application', 'voip', '-f', 'ogg'],
+    'mp3': ['-c:a', 'libmp3lame', '-b:a', '64k', '-f', 'mp3'],
+    'wav': ['-c:a', 'pcm_s16le', '-f', 'wav'],
+}
+# WAV equivalente (22.05kHz, mono, 16 bits) para o comparativo de tamanho
+PCM_BYTES_PER_SEC = 22050 * 2
+
+# Estatísticas de codificação da execução (para o resumo final)
+_encode_stats = {'files': 0, 'bytes': 0, 'wav_bytes': 0, 'seconds': 0.0}
+_encode_stats_lock = threading.Lock()
+
+_tts_episodes = counter('newsbot_tts_episodes_total', "Episódios de áudio por engine e origem (cache/síntese)")
+_tts_segments = counter('newsbot_tts_segments_total', "Segmentos de áudio por engine e origem (cache/síntese)")
+
+
+def get_encode_stats():
+    with _encode_stats_lock:
+        return dict(_encode_stats)
+
+
+def _record_encode(output_path, duration, elapsed):
+    with _encode_stats_lock:
+        _encode_stats['files'] += 1
+        _encode_stats['bytes'] += os.path.getsize(output_path)
+        _encode_stats['wav_bytes'] += int(duration * PCM_BYTES_PER_SEC)
+        _encode_stats['seconds'] += elapsed
+
+
+def _ffmpeg_cmd(fmt, source, output_path, input_args=()):
+    return ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-nostats',
+            '-progress', 'pipe:1', '-y', *input_args, '-i', source,
+            *_FFMPEG_CODEC[fmt], str(output_path)]
+
+
+def _progress_duration(progress):
+    """Duração (s) do último bloco `-progress` do ffmpeg (out_time_us)."""
+    duration = 0.0
+    for line in progress.splitlines():
+        key, _, value = line.partition('=')
+        if key in ('out_time_us', 'out_time_ms') and value.strip().isdigit():
+            duration = int(value) / 1_000_000
+    return duration
+
+
+def output_format(engine):
+    """Formato final para o engine: Config.AUDIO_FORMAT se houver ffmpeg, senão o nativo."""
+    fmt = Config.AUDIO_FORMAT
+    if fmt == NATIVE_FORMAT[engine]:
+        return fmt
+    if fmt not in _FFMPEG_CODEC:
+        logger.warning(f"Formato de áudio desconhecido: {fmt}")
+        return NATIVE_FORMAT[engine]
+    if shutil.which('ffmpeg') is None:
+        logger.warning(f"ffmpeg não encontrado, mantendo {NATIVE_FORMAT[engine]} em vez de {fmt}")
+        return NATIVE_FORMAT[engine]
+    return fmt
+
 # ─── Helpers ───────────────────────────────────────────────────────────────
 
 def _check_piper():
@@ -39,52 +115,137 @@ def _check_piper():
     return True
 
 
-def _generate_with_piper(text, output_path):
+class _PiperWorker:
     """
-    Gera áudio usando Piper TTS (offline, inglês).
-    Roda em subprocesso — muito rápido (~0.15x real-time).
+    Processo Piper residente (modo --json-input).
+
+    O modelo .onnx é carregado uma vez só; cada job é uma linha JSON
+    {"text": ..., "output_file": ...} no stdin e o Piper responde com o
+    caminho do arquivo gerado no stdout. Se o processo morrer, é
+    reiniciado automaticamente no próximo job.
     """
-    try:
+
+    TIMEOUT = 120  # segundos por job
+
+    def __init__(self):
+        self._proc = None
+        self._stdout = None
+        self._stderr = collections.deque(maxlen=20)
+        self._lock = threading.Lock()
+        self.jobs = 0
+        self.restarts = 0
+
+    def _alive(self):
+        return self._proc is not None and self._proc.poll() is None
+
+    def _start(self):
         cmd = [
             str(PIPER_EXEC),
             "--model", str(PIPER_VOICE_MODEL),
             "--config", str(PIPER_VOICE_JSON),
-            "--output_file", str(output_path),
+            "--json-input",
+            "--output_dir", str(Config.AUDIO_DIR),
         ]
-        process = subprocess.run(
+        self._proc = subprocess.Popen(
             cmd,
-            input=text.encode('utf-8'),
-            capture_output=True,
-            timeout=120,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            bufsize=1,
         )
-        if process.returncode != 0:
-            logger.error(f"Piper erro (código {process.returncode}): {process.stderr.decode().strip()}")
+        self._stdout = queue.Queue()
+        self._stderr.clear()
+        threading.Thread(target=self._pump, args=(self._proc.stdout, self._stdout.put),
+                         name="piper-stdout", daemon=True).start()
+        threading.Thread(target=self._pump, args=(self._proc.stderr, self._stderr.append),
+                         name="piper-stderr", daemon=True).start()
+        logger.info(f"🔊 Piper worker iniciado (pid {self._proc.pid})")
+
+    @staticmethod
+    def _pump(stream, sink):
+        for line in stream:
+            sink(line.rstrip('\n'))
+        sink(None)  # EOF: processo terminou
+
+    def _kill(self):
+        if self._proc is not None:
+            self._proc.kill()
+            self._proc.wait()
+            self._proc = None
+
+    def synthesize(self, text, output_path):
+        """Envia um job ao Piper e espera o arquivo. Reinicia o processo 1x se ele morreu."""
+        job = json.dumps({"text": text, "output_file": str(output_path)}, ensure_ascii=False)
+        with self._lock:
+            for attempt in range(2):
+                if not self._alive():
+                    if self._proc is not None:
+                        self.restarts += 1
+                        logger.warning(f"Piper worker morreu (código {self._proc.returncode}), reiniciando...")
+                    self._start()
+                try:
+                    self._proc.stdin.write(job + "\n")
+                    self._proc.stdin.flush()
+                    line = self._stdout.get(timeout=self.TIMEOUT)
+                except (BrokenPipeError, OSError):
+                    line = None
+                except queue.Empty:
+                    logger.error(f"Piper timeout após {self.TIMEOUT}s")
+                    self._kill()
+                    return False
+                if line is not None:
+                    self.jobs += 1
+                    return True
+                stderr = " | ".join(l for l in self._stderr if l)
+                logger.error(f"Piper erro (tentativa {attempt + 1}): {stderr[-300:]}")
+                self._proc.wait()
+            return False
+
+    def stop(self):
+        with self._lock:
+            if self._alive():
+                try:
+                    self._proc.stdin.close()
+                    self._proc.wait(timeout=10)
+                except (OSError, subprocess.TimeoutExpired):
+                    self._kill()
+            self._proc = None
+
+
+_piper_worker = _PiperWorker()
+atexit.register(_piper_worker.stop)
+
+
+def _generate_with_piper(text, output_path):
+    """
+    Gera áudio usando Piper TTS (offline, inglês), em WAV (formato nativo).
+    Usa o worker residente — o modelo só é carregado na primeira chamada.
+    """
+    try:
+        if not _piper_worker.synthesize(text, output_path):
             return False
         if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
             logger.info(f"✅ Piper: {output_path.name} ({os.path.getsize(output_path)//1024}KB)")
             return True
         return False
-    except subprocess.TimeoutExpired:
-        logger.error("Piper timeout após 120s")
-        return False
     except Exception as e:
         logger.error(f"Piper erro: {e}")
         return False
 
 
-def _generate_with_edge_tts(text, output_path, voice):
+async def _generate_with_edge_tts(text, output_path, voice):
     """
-    Gera áudio usando Edge-TTS (online, vozes neurais naturais).
-    Suporta PT-BR e EN com qualidade superior.
+    Gera áudio usando Edge-TTS (online, vozes neurais naturais), em MP3
+    (formato nativo). Suporta PT-BR e EN com qualidade superior.
+    Corrotina: roda no event loop compartilhado do _TTSScheduler.
     """
     try:
-        async def _run():
-            communicate = edge_tts.Communicate(text, voice)
-            await communicate.save(str(output_path))
-
         # Edge-tts precisa do módulo importado aqui (pode não estar na venv)
         import edge_tts
-        asyncio.run(_run())
+        communicate = edge_tts.Communicate(text, voice)
+        await communicate.save(str(output_path))
 
         if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
             logger.info(f"✅ Edge-TTS ({voice}): {output_path.name} ({os.path.getsize(output_path)//1024}KB)")
@@ -98,52 +259,295 @@ def _generate_with_edge_tts(text, output_path, voice):
         return False
 
 
-# ─── API pública ───────────────────────────────────────────────────────────
-
-def generate_audio_file(text, filename, language='en'):
+class _TTSScheduler:
     """
-    Gera áudio TTS.
+    Agenda jobs de TTS nos dois engines em paralelo:
 
-    Args:
-        text: Texto a ser falado (headlines curto)
-        filename: Nome do arquivo (ex: 'feed_20260605.wav')
-        language: 'pt' para português (edge-tts), 'en' para inglês (Piper)
+    - Edge-TTS (rede): um único event loop asyncio de longa duração, numa
+      thread própria, com no máximo Config.EDGE_TTS_CONCURRENCY jobs ao
+      mesmo tempo — sem criar um loop novo (asyncio.run) por feed.
+    - Piper (CPU local): fila de uma thread só alimentando o _PiperWorker.
 
-    Returns:
-        Caminho do arquivo .wav ou None em caso de erro
+    Assim um feed PT e um EN são sintetizados ao mesmo tempo e o tempo
+    total fica perto do engine mais lento, não da soma.
     """
-    if not text:
-        return None
 
-    output_path = Config.AUDIO_DIR / filename
-    # Garante extensão .wav
-    if output_path.suffix.lower() not in ('.wav', '.mp3'):
-        output_path = output_path.with_suffix('.wav')
+    def __init__(self):
+        self._loop = None
+        self._semaphore = None
+        self._piper_queue = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever,
+                                 name="edge-tts-loop", daemon=True).start()
+                self._semaphore = asyncio.run_coroutine_threadsafe(
+                    self._make_semaphore(), self._loop).result()
+                self._piper_queue = ThreadPoolExecutor(max_workers=1, thread_name_prefix="piper")
+
+    @staticmethod
+    async def _make_semaphore():
+        return asyncio.Semaphore(Config.EDGE_TTS_CONCURRENCY)
+
+    async def _edge_job(self, text, output_path, voice):
+        async with self._semaphore:
+            return await _generate_with_edge_tts(text, output_path, voice)
+
+    def submit(self, engine, text, output_path, voice):
+        """Agenda um job (formato nativo do engine) e retorna um concurrent.futures.Future[bool]."""
+        self._ensure_started()
+        if engine == 'piper':
+            return self._piper_queue.submit(_generate_with_piper, text, output_path)
+        return asyncio.run_coroutine_threadsafe(
+            self._edge_job(text, output_path, voice), self._loop)
+
+    def stop(self):
+        with self._lock:
+            if self._piper_queue is not None:
+                self._piper_queue.shutdown(wait=False)
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
 
-    # Cache: se já existe, retorna
-    if output_path.exists() and output_path.stat().st_size > 1000:
-        logger.info(f"⏭️  Áudio em cache: {output_path.name}")
-        return str(output_path)
 
-    logger.info(f"🎙️  Gerando áudio ({language.upper()}): {output_path.name}...")
+_scheduler = _TTSScheduler()
+atexit.register(_scheduler.stop)
 
-    # Decide qual engine usar baseado no idioma
+
+# ─── API pública ───────────────────────────────────────────────────────────
+
+def _select_engine(language):
+    """Retorna (engine, voz, formato) para o idioma."""
     if language == 'pt':
         # PT → Edge-TTS (voz natural)
-        logger.info(f"   Engine: Edge-TTS ({EDGE_VOICE_PT})")
-        success = _generate_with_edge_tts(text, output_path, EDGE_VOICE_PT)
-    else:
+        engine, voice = 'edge', EDGE_VOICE_PT
+    elif _check_piper():
         # EN → Piper (offline, rápido)
-        if _check_piper():
-            logger.info("   Engine: Piper (offline)")
-            success = _generate_with_piper(text, output_path)
-        else:
-            # Fallback: Edge-TTS em inglês
-            logger.warning("   Piper indisponível, fallback para Edge-TTS (EN)")
-            success = _generate_with_edge_tts(text, output_path, EDGE_VOICE_EN)
-
-    if success:
-        return str(output_path)
+        engine, voice = 'piper', Config.VOICE_EN
     else:
-        logger.error(f"❌ Falha ao gerar áudio: {output_path.name}")
+        # Fallback: Edge-TTS em inglês
+        logger.warning("   Piper indisponível, fallback para Edge-TTS (EN)")
+        engine, voice = 'edge', EDGE_VOICE_EN
+    return engine, voice, output_format(engine)
+
+
+def _partial_path(output_path):
+    """Arquivo temporário único (dois workers podem gerar a mesma chave)."""
+    return output_path.with_name(f"{output_path.name}.{uuid.uuid4().hex[:8]}.part")
+
+
+def _submit_cached(text, engine, voice):
+    """
+    Consulta o cache; se não tiver, agenda a síntese no _TTSScheduler
+    (segmentos ficam no formato nativo do engine).
+
+    Returns:
+        (chave, caminho final, future ou None se veio do cache, arquivo parcial)
+    """
+    fmt = NATIVE_FORMAT[engine]
+    key = audio_cache.key(text, engine, voice, fmt)
+    cached = audio_cache.lookup(key)
+    if cached is not None:
+        return key, cached, None, None
+    output_path = audio_cache.path_for(key, FORMAT_EXT[fmt])
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    partial = _partial_path(output_path)
+    return key, output_path, _scheduler.submit(engine, text, partial, voice), partial
+
+
+def _finish_cached(key, output_path, future, partial):
+    """Espera a síntese e move o resultado para o cache. Retorna o caminho ou None."""
+    if future is None:
+        return output_path
+    try:
+        success = future.result()
+    except Exception as e:
+        logger.error(f"TTS erro: {e}")
+        success = False
+    if not success:
+        partial.unlink(missing_ok=True)
+        return None
+    os.replace(partial, output_path)
+    audio_cache.store(key, output_path)
+    return output_path
+
+
+# ─── Episódio por segmentos ────────────────────────────────────────────────
+
+def _concat_wav(paths, sink, pause_ms):
+    """
+    Copia os frames PCM dos WAVs para `sink(bytes)`, com silêncio entre eles.
+    Retorna os parâmetros do áudio (wave._wave_params).
+    """
+    params = None
+    for i, path in enumerate(paths):
+        with wave.open(str(path), 'rb') as w:
+            current = w.getparams()
+            if params is None:
+                params = current
+            elif current[:3] != params[:3]:
+                raise ValueError(f"Segmento com formato diferente: {path}")
+            if i:
+                frames = int(params.framerate * pause_ms / 1000)
+                sink(b'\x00' * frames * params.sampwidth * params.nchannels)
+            while True:
+                chunk = w.readframes(8192)
+                if not chunk:
+                    break
+                sink(chunk)
+    return params
+
+
+def _concat_bytes(paths, sink):
+    """Concatena arquivos byte a byte (frames MP3 podem ser emendados direto)."""
+    for path in paths:
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(65536)
+                if not chunk:
+                    break
+                sink(chunk)
+
+
+def _padded_concat_cmd(fmt, paths, output_path, pause_ms):
+    """
+    ffmpeg que junta arquivos comprimidos (MP3 do Edge) com `pause_ms` de
+    silêncio entre eles: apad no fim de cada segmento, menos o último, e
+    filtro concat — silêncio no formato dos próprios segmentos.
+    """
+    last = len(paths) - 1
+    pad = f"{pause_ms / 1000:.3f}"
+    chains = [f"[{i}:a]apad=pad_dur={pad}[a{i}]" for i in range(last)]
+    labels = "".join(f"[a{i}]" for i in range(last)) + f"[{last}:a]"
+    graph = ";".join(chains + [f"{labels}concat=n={len(paths)}:v=0:a=1[out]"])
+    inputs = [arg for path in paths for arg in ('-i', str(path))]
+    return ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-nostats',
+            '-progress', 'pipe:1', '-y', *inputs, '-filter_complex', graph,
+            '-map', '[out]', *_FFMPEG_CODEC[fmt], str(output_path)]
+
+
+def _run_encoder(cmd, fmt, output_path, feed=None):
+    """
+    Roda o ffmpeg; `feed(write)`, se houver, manda o áudio pelo stdin.
+    Registra duração e tempo da codificação (get_encode_stats).
+    """
+    start = time.monotonic()
+    encoder = subprocess.Popen(cmd, stdin=subprocess.PIPE if feed else subprocess.DEVNULL,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    # stdout/stderr lidos em paralelo para o ffmpeg nunca travar escrevendo
+    outputs = {}
+    readers = [threading.Thread(target=lambda n=n, f=f: outputs.__setitem__(n, f.read()), daemon=True)
+               for n, f in (('progress', encoder.stdout), ('errors', encoder.stderr))]
+    for t in readers:
+        t.start()
+    try:
+        if feed:
+            feed(encoder.stdin.write)
+            encoder.stdin.close()
+        encoder.wait(timeout=60)
+    except Exception:
+        encoder.kill()
+        raise
+    for t in readers:
+        t.join()
+    if encoder.returncode != 0:
+        logger.error(f"ffmpeg erro ({fmt}): {outputs.get('errors', b'').decode().strip()[-300:]}")
+        return False
+    _record_encode(output_path, _progress_duration(outputs.get('progress', b'').decode()),
+                   time.monotonic() - start)
+    return True
+
+
+def _assemble_episode(segment_paths, native, fmt, output_path):
+    """
+    Junta os segmentos, com Config.AUDIO_SEGMENT_PAUSE_MS de silêncio entre
+    eles. WAV (Piper) é concatenado sem recodificar: direto no arquivo se o
+    formato final for o nativo, senão em streaming para o stdin do ffmpeg
+    (uma única codificação do episódio). MP3 (Edge) não tem como ganhar
+    silêncio por concatenação, então passa pelo ffmpeg (apad + concat); sem
+    pausa, ou sem ffmpeg, os frames são emendados direto.
+    """
+    pause = Config.AUDIO_SEGMENT_PAUSE_MS
+    if native == 'wav':
+        if fmt == native:
+            with wave.open(str(segment_paths[0]), 'rb') as first:
+                params = first.getparams()
+            with wave.open(str(output_path), 'wb') as out:
+                out.setparams(params)
+                _concat_wav(segment_paths, out.writeframesraw, pause)
+            return True
+        with wave.open(str(segment_paths[0]), 'rb') as first:
+            rate, channels = first.getframerate(), first.getnchannels()
+        input_args = ['-f', 's16le', '-ar', str(rate), '-ac', str(channels)]
+        return _run_encoder(_ffmpeg_cmd(fmt, 'pipe:0', output_path, input_args), fmt, output_path,
+                            lambda write: _concat_wav(segment_paths, write, pause))
+
+    if pause > 0 and len(segment_paths) > 1 and shutil.which('ffmpeg') is not None:
+        return _run_encoder(_padded_concat_cmd(fmt, segment_paths, output_path, pause),
+                            fmt, output_path)
+    if fmt == native:
+        with open(output_path, 'wb') as out:
+            _concat_bytes(segment_paths, out.write)
+        return True
+    return _run_encoder(_ffmpeg_cmd(fmt, 'pipe:0', output_path, ['-f', 'mp3']), fmt, output_path,
+                        lambda write: _concat_bytes(segment_paths, write))
+
+
+def generate_episode_audio(segments, filename, language='en'):
+    """
+    Gera o áudio de um episódio a partir de segmentos (abertura, números,
+    manchetes). Cada segmento é sintetizado e guardado no cache pelo hash
+    do próprio texto, no formato nativo do engine; o episódio é montado
+    concatenando os segmentos. Numa execução repetida ou parcial só as
+    manchetes novas passam pelo TTS.
+
+    Returns:
+        Caminho do episódio no formato Config.AUDIO_FORMAT ou None
+    """
+    segments = [s for s in segments if s and s.strip()]
+    if not segments:
+        return None
+
+    engine, voice, fmt = _select_engine(language)
+    native = NATIVE_FORMAT[engine]
+
+    # Episódio inteiro já montado antes (mesmos segmentos)?
+    # A pausa entra na chave: mudar AUDIO_SEGMENT_PAUSE_MS remonta os episódios
+    episode_key = audio_cache.key("\n".join(segments), engine, voice,
+                                  f"{fmt}:episode:{Config.AUDIO_SEGMENT_PAUSE_MS}ms")
+    cached = audio_cache.lookup(episode_key)
+    if cached is not None:
+        logger.info(f"⏭️  Episódio em cache: {filename} ({cached.name[:12]}…)")
+        _tts_episodes.inc(engine=engine, source='cache')
+        return str(cached)
+
+    # Todos os segmentos que faltam são agendados de uma vez (PT/EN em paralelo)
+    jobs = [_submit_cached(text, engine, voice) for text in segments]
+    new = sum(1 for job in jobs if job[2] is not None)
+    logger.info(f"🎙️  Áudio ({language.upper()}, {engine}/{voice}): {filename} — "
+                f"{len(segments)} segmentos, {new} novos, {len(segments) - new} do cache")
+    _tts_episodes.inc(engine=engine, source='synth')
+    _tts_segments.inc(new, engine=engine, source='synth')
+    _tts_segments.inc(len(segments) - new, engine=engine, source='cache')
+    paths = [_finish_cached(*job) for job in jobs]
+    if any(p is None for p in paths):
+        logger.error(f"❌ Falha ao gerar segmentos: {filename}")
+        return None
+
+    output_path = audio_cache.path_for(episode_key, FORMAT_EXT[fmt])
+    partial = _partial_path(output_path)
+    try:
+        ok = _assemble_episode(paths, native, fmt, partial)
+    except Exception as e:
+        logger.error(f"❌ Erro ao montar episódio {filename}: {e}")
+        ok = False
+    if not ok:
+        partial.unlink(missing_ok=True)
         return None
+    os.replace(partial, output_path)
+    audio_cache.store(episode_key, output_path)
+    logger.info(f"✅ Episódio: {filename} ({os.path.getsize(output_path)//1024}KB)")
+    return str(output_path)
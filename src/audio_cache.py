@@ -0,0 +1,143 @@
+import logging
+import threading
+import time
+from pathlib import Path
+
+from .cache import content_key
+from .config import Config
+from .storage import load_json, save_json
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.ogg', '.opus')
+
+
+class AudioCache:
+    """
+    Cache de áudio TTS endereçado por conteúdo.
+
+    - Chave: hash(texto, engine, voz, formato) → data/audio/cache/<chave>.<formato>
+    - Índice em index.json com tamanho, criação, último uso e hits
+    - Orçamento de disco (Config.AUDIO_CACHE_MAX_MB) com despejo LRU, e
+      despejo por idade de arquivos sem uso há mais de Config.RETENTION_DAYS
+    """
+
+    def __init__(self, directory=None, max_bytes=None, max_age_days=None):
+        self.dir = directory or Config.AUDIO_CACHE_DIR
+        self.index_file = self.dir / "index.json"
+        self.max_bytes = max_bytes or Config.AUDIO_CACHE_MAX_MB * 1024 * 1024
+        self.max_age = (max_age_days or Config.RETENTION_DAYS) * 86400
+        self._index = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self.bytes_written = 0
+        self.bytes_evicted = 0
+
+    @staticmethod
+    def key(text, engine, voice, fmt):
+        return content_key(text, engine, voice, fmt)
+
+    def _load(self):
+        if self._index is None:
+            self._index = load_json(self.index_file, default={}) or {}
+
+    def path_for(self, key, fmt):
+        return self.dir / f"{key}.{fmt}"
+
+    def lookup(self, key):
+        """Caminho do áudio em cache ou None (conta hit/miss)."""
+        with self._lock:
+            self._load()
+            entry = self._index.get(key)
+            if entry:
+                path = self.dir / entry['file']
+                if path.exists() and path.stat().st_size > 0:
+                    entry['last_used'] = time.time()
+                    entry['hits'] = entry.get('hits', 0) + 1
+                    self.hits += 1
+                    self.bytes_served += entry['size']
+                    return path
+                del self._index[key]
+            self.misses += 1
+            return None
+
+    def store(self, key, path):
+        """Registra um arquivo recém-gerado em path_for(key, ...)."""
+        size = path.stat().st_size
+        now = time.time()
+        with self._lock:
+            self._load()
+            self._index[key] = {'file': path.name, 'size': size,
+                                'created': now, 'last_used': now, 'hits': 0}
+            self.bytes_written += size
+
+    def _remove(self, key):
+        entry = self._index.pop(key)
+        (self.dir / entry['file']).unlink(missing_ok=True)
+        self.bytes_evicted += entry['size']
+
+    def evict(self, keep=()):
+        """
+        Aplica idade máxima e orçamento de disco (LRU). Arquivos em `keep`
+        (ex: áudios ainda no outbox) não são removidos. Retorna nº de removidos.
+        """
+        keep = {Path(p).name for p in keep}
+        with self._lock:
+            self._load()
+            now = time.time()
+            removed = 0
+            for key in [k for k, e in self._index.items()
+                        if now - e['last_used'] > self.max_age and e['file'] not in keep]:
+                self._remove(key)
+                removed += 1
+
+            total = sum(e['size'] for e in self._index.values())
+            for key in sorted(self._index, key=lambda k: self._index[k]['last_used']):
+                if total <= self.max_bytes:
+                    break
+                if self._index[key]['file'] in keep:
+                    continue
+                total -= self._index[key]['size']
+                self._remove(key)
+                removed += 1
+
+            # Arquivos órfãos (fora do índice) e, na pasta de cima, áudios antigos
+            # do cache por nome/data ({feed}_{YYYYMMDD}.wav) que passaram da idade
+            known = {e['file'] for e in self._index.values()} | keep
+            orphans = [f for f in self.dir.glob("*") if f.name not in known] if self.dir.exists() else []
+            legacy = [f for f in self.dir.parent.glob("*")
+                      if f.is_file() and f.name not in keep and now - f.stat().st_mtime > self.max_age] \
+                if self.dir.parent.exists() else []
+            for f in orphans + legacy:
+                if f.suffix.lower() in AUDIO_EXTENSIONS + ('.part',):
+                    self.bytes_evicted += f.stat().st_size
+                    f.unlink(missing_ok=True)
+                    removed += 1
+        if removed:
+            logger.info(f"🧹 {removed} áudios removidos do cache.")
+        return removed
+
+    def save(self):
+        with self._lock:
+            if self._index is not None:
+                save_json(self.index_file, self._index)
+
+    def stats(self):
+        with self._lock:
+            self._load()
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+                'bytes_served': self.bytes_served,
+                'bytes_written': self.bytes_written,
+                'bytes_evicted': self.bytes_evicted,
+                'files': len(self._index),
+                'bytes_total': sum(e['size'] for e in self._index.values()),
+            }
+
+
+audio_cache = AudioCache()
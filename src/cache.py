@@ -0,0 +1,96 @@
+import hashlib
+import logging
+import threading
+import time
+
+from .storage import load_json, save_json
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(*parts):
+    """Chave de cache: sha256 das partes (texto, idioma, parâmetros...)."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode('utf-8'))
+        h.update(b'\x00')
+    return h.hexdigest()
+
+
+class DiskCache:
+    """
+    Cache chave → valor persistido em JSON.
+
+    - Carregado sob demanda na primeira consulta, gravado com save()
+    - Despejo por idade (max_age_days) e por tamanho (max_entries, LRU)
+    - Conta hits/misses para o resumo da execução
+    """
+
+    def __init__(self, path, max_entries=1000, max_age_days=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400 if max_age_days else None
+        self.hits = 0
+        self.misses = 0
+        self._entries = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = load_json(self.path, default={}) or {}
+
+    def get(self, key):
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            now = time.time()
+            if entry is None or (self.max_age and now - entry['ts'] > self.max_age):
+                self.misses += 1
+                return None
+            entry['used'] = now
+            self._dirty = True
+            self.hits += 1
+            return entry['value']
+
+    def set(self, key, value):
+        with self._lock:
+            self._load()
+            now = time.time()
+            self._entries[key] = {'value': value, 'ts': now, 'used': now}
+            self._dirty = True
+
+    def delete(self, key):
+        with self._lock:
+            self._load()
+            if self._entries.pop(key, None) is not None:
+                self._dirty = True
+
+    def _evict(self):
+        now = time.time()
+        if self.max_age:
+            expired = [k for k, e in self._entries.items() if now - e['ts'] > self.max_age]
+            for k in expired:
+                del self._entries[k]
+        overflow = len(self._entries) - self.max_entries
+        if overflow > 0:
+            oldest = sorted(self._entries, key=lambda k: self._entries[k]['used'])[:overflow]
+            for k in oldest:
+                del self._entries[k]
+
+    def save(self):
+        with self._lock:
+            if self._entries is None or not self._dirty:
+                return
+            self._evict()
+            save_json(self.path, self._entries)
+            self._dirty = False
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            'entries': len(self._entries or {}),
+        }
@@ -1,59 +1,532 @@
-import feedparser
+import hashlib
 import logging
 import socket
-from datetime import datetime
+import threading
+import time
+import weakref
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from time import mktime
+from urllib.parse import urlparse
 
 from .config import Config
+from .metrics import counter
+from .storage import load_json, save_json
 
 logger = logging.getLogger(__name__)
 
-# Timeout global para conexões de rede
-socket.setdefaulttimeout(Config.DOWNLOAD_TIMEOUT)
+_download_bytes = counter('newsbot_download_bytes_total', "Bytes baixados dos feeds (na rede)")
+_fetches = counter('newsbot_feed_fetches_total', "Consultas a feeds por resultado")
 
-def collect_feed_data(feed_url, limit=5):
+# ─── Sessão HTTP compartilhada ────────────────────────────────────────────
+# Uma session (pool de conexões keep-alive por host) para todos os feeds e,
+# no daemon, para todas as levas. Timeouts separados de conexão e de leitura.
+_session = None
+_session_lock = threading.Lock()
+_http_stats = {'requests': 0, 'connections': 0, 'dns_hits': 0, 'dns_misses': 0}
+_http_stats_lock = threading.Lock()
+_seen_sockets = weakref.WeakSet()   # socket já usado antes = conexão reaproveitada
+
+
+def _count(stat):
+    with _http_stats_lock:
+        _http_stats[stat] += 1
+
+
+def _get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from urllib3.util.request import ACCEPT_ENCODING
+
+            _session = requests.Session()
+            adapter = _feed_adapter()
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+            _session.headers.update({
+                'User-Agent': Config.USER_AGENT,
+                # gzip/deflate, e br se o pacote brotli estiver instalado
+                'Accept-Encoding': ACCEPT_ENCODING,
+            })
+        return _session
+
+
+# ─── Cache de DNS (só da session dos feeds) ───────────────────────────────
+# Conexões novas ao mesmo host (pool cheio, keep-alive expirado, próxima leva
+# do daemon) não repetem a consulta no resolver do Pi. Vale só para as
+# conexões dos feeds: Telegram e Edge-TTS continuam no getaddrinfo normal.
+# O getaddrinfo não informa o TTL do registro, então o prazo é fixo
+# (Config.DNS_CACHE_TTL) e curto; endereço que recusa conexão sai do cache.
+_dns_cache = {}
+_dns_lock = threading.Lock()
+
+
+def _resolve(host, port, family):
+    """Endereços (host, porta) para conectar, do cache ou do resolver."""
+    key = (host, port, family)
+    now = time.monotonic()
+    with _dns_lock:
+        entry = _dns_cache.get(key)
+    if entry and entry[0] > now:
+        _count('dns_hits')
+        return entry[1]
+    infos = socket.getaddrinfo(host, port, family, socket.SOCK_STREAM)
+    _count('dns_misses')
+    addresses = list(dict.fromkeys(info[4][0] for info in infos))
+    with _dns_lock:
+        _dns_cache[key] = (now + Config.DNS_CACHE_TTL, addresses)
+    return addresses
+
+
+def _forget(host, port, family):
+    with _dns_lock:
+        _dns_cache.pop((host, port, family), None)
+
+
+def _feed_adapter():
+    """
+    HTTPAdapter com pool por host (keep-alive) cujas conexões resolvem o
+    nome pelo cache de DNS acima. As classes são montadas aqui para o
+    requests/urllib3 só serem importados na primeira coleta.
+    """
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+    from urllib3.exceptions import NameResolutionError, NewConnectionError
+    from urllib3.util.connection import allowed_gai_family
+
+    class CachedDNS:
+        def _new_conn(self):
+            # O TLS (SNI/certificado) usa self.host; só o connect vai pelo IP
+            host, family = self._dns_host, allowed_gai_family()
+            try:
+                addresses = _resolve(host, self.port, family)
+            except socket.gaierror as e:
+                raise NameResolutionError(self.host, self, e) from e
+            error = None
+            for address in addresses:
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except NewConnectionError as e:
+                    error = e
+                finally:
+                    self._dns_host = host
+            _forget(host, self.port, family)
+            raise error
+
+    class Connection(CachedDNS, HTTPConnection):
+        pass
+
+    class SecureConnection(CachedDNS, HTTPSConnection):
+        pass
+
+    class Pool(HTTPConnectionPool):
+        ConnectionCls = Connection
+
+    class SecurePool(HTTPSConnectionPool):
+        ConnectionCls = SecureConnection
+
+    class FeedAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {'http': Pool, 'https': SecurePool}
+
+    return FeedAdapter(pool_connections=Config.FETCH_POOL_HOSTS,
+                       pool_maxsize=Config.FETCH_PER_HOST, max_retries=0)
+
+
+def _is_timeout(error):
+    import requests
+    from urllib3.exceptions import TimeoutError as Urllib3Timeout
+
+    return isinstance(error, (socket.timeout, requests.Timeout, Urllib3Timeout))
+
+
+def get_connection_stats():
+    """Requisições, conexões abertas e cache de DNS dos feeds (acumulado no processo)."""
+    with _http_stats_lock:
+        stats = dict(_http_stats)
+    stats['reused'] = stats['requests'] - stats['connections']
+    stats['reuse_rate'] = round(stats['reused'] / stats['requests'], 3) if stats['requests'] else 0.0
+    return stats
+
+# ─── Limite de conexões por host ──────────────────────────────────────────
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+
+
+@contextmanager
+def _host_slot(feed_url):
+    """Limita downloads simultâneos no mesmo host (ex: feedburner, BBC)."""
+    host = urlparse(feed_url).netloc.lower()
+    with _host_slots_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = threading.BoundedSemaphore(Config.FETCH_PER_HOST)
+            _host_slots[host] = slot
+    with slot:
+        yield
+
+
+# ─── Cache de validadores (GET condicional) ───────────────────────────────
+# { feed_url: {"etag": ..., "modified": ..., "body_hash": ...} }
+# Validadores novos ficam pendentes até o feed terminar o pipeline
+# (commit_validators): se o resumo, o TTS ou o envio falhar, a próxima
+# execução não recebe 304/"mesmo conteúdo" e processa as notícias de novo.
+_feed_cache = None
+_pending_validators = {}
+_feed_cache_lock = threading.Lock()
+_feed_cache_dirty = False
+
+
+def _load_feed_cache():
+    global _feed_cache
+    if _feed_cache is None:
+        _feed_cache = load_json(Config.FEED_CACHE_FILE, default={}) or {}
+    return _feed_cache
+
+
+def _get_validators(feed_url):
+    with _feed_cache_lock:
+        return dict(_load_feed_cache().get(feed_url, {}))
+
+
+def _set_validators(feed_url, validators, pending=True):
+    global _feed_cache_dirty
+    with _feed_cache_lock:
+        if pending:
+            _pending_validators[feed_url] = validators
+            return
+        # --force não lê os validadores, mas grava os novos
+        _load_feed_cache()[feed_url] = validators
+        _pending_validators.pop(feed_url, None)
+        _feed_cache_dirty = True
+
+
+def commit_validators(feed_url):
+    """Confirma os validadores do feed (notícias entregues ou no outbox)."""
+    with _feed_cache_lock:
+        validators = _pending_validators.pop(feed_url, None)
+    if validators is not None:
+        _set_validators(feed_url, validators, pending=False)
+
+
+def save_feed_cache():
+    """
+    Persiste ETag/Last-Modified/hash dos feeds confirmados (chamar ao fim da
+    execução). Pendentes que não foram confirmados são descartados.
+    """
+    global _feed_cache_dirty
+    with _feed_cache_lock:
+        _pending_validators.clear()
+        if _feed_cache is None or not _feed_cache_dirty:
+            return
+        save_json(Config.FEED_CACHE_FILE, _feed_cache)
+        _feed_cache_dirty = False
+
+
+class FeedTooLarge(Exception):
+    """Resposta passou de Config.MAX_FEED_BYTES (download abortado)."""
+
+
+@contextmanager
+def _fetch(feed_url, validators):
+    """
+    Abre o feed com GET condicional pela session compartilhada, sem ler o corpo.
+
+    Yields:
+        (status, chunks, headers) — chunks é um gerador de blocos já
+        descomprimidos (ver _read_chunks); status 304 e chunks None se não mudou
+    """
+    headers = {}
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('modified'):
+        headers['If-Modified-Since'] = validators['modified']
+
+    resp = _get_session().get(feed_url, headers=headers, stream=True, allow_redirects=True,
+                              timeout=(Config.FETCH_CONNECT_TIMEOUT, Config.DOWNLOAD_TIMEOUT))
+    _count('requests')
+    sock = getattr(resp.raw.connection, 'sock', None)
+    if sock is not None and sock not in _seen_sockets:
+        _seen_sockets.add(sock)
+        _count('connections')
+    try:
+        if resp.status_code == 304:
+            yield 304, None, resp.headers
+            return
+        resp.raise_for_status()
+        yield resp.status_code, _read_chunks(resp), resp.headers
+    finally:
+        _release(resp)
+
+
+def _drain(raw, budget):
+    """Lê e descarta até `budget` bytes do corpo; True se ele terminou."""
+    while budget > 0 and not raw.closed:
+        data = raw.read(min(budget, Config.FEED_CHUNK_SIZE), decode_content=False)
+        if not data:
+            break
+        budget -= len(data)
+    return raw.closed
+
+
+def _release(resp):
+    """
+    Devolve a conexão ao pool. Se o parser parou antes do fim do corpo, lê e
+    descarta o resto quando é pouco (Config.FEED_DRAIN_BYTES); senão fecha a
+    conexão — baixar megabytes só para reaproveitá-la não compensa. Sem
+    Content-Length (chunked), tenta ler até o mesmo limite antes de desistir.
+    """
+    raw = resp.raw
+    if raw.connection is not None:
+        length = resp.headers.get('Content-Length')
+        known = length and length.isdigit()
+        if not (known and int(length) - raw.tell() > Config.FEED_DRAIN_BYTES) \
+                and _drain(raw, Config.FEED_DRAIN_BYTES):
+            raw.release_conn()
+    _download_bytes.inc(raw.tell())
+    resp.close()
+
+
+def _read_chunks(resp, max_bytes=None):
+    """
+    Lê o corpo em blocos de Config.FEED_CHUNK_SIZE, já descomprimidos pelo
+    urllib3 (que também limita a expansão por bloco). Levanta FeedTooLarge se
+    o conteúdo descomprimido passar de max_bytes — vale também para "bombas".
+    """
+    max_bytes = max_bytes or Config.MAX_FEED_BYTES
+    # Sem olhar o Content-Length: um feed enorme ainda serve se as `limit`
+    # notícias vierem antes do teto — o limite vale para o que foi lido
+    total = 0
+    for data in resp.raw.stream(Config.FEED_CHUNK_SIZE, decode_content=True):
+        total += len(data)
+        if total > max_bytes:
+            raise FeedTooLarge(f"mais de {max_bytes // 1024}KB")
+        yield data
+
+
+# ─── Parser incremental (RSS 2.0 / RSS 1.0 / Atom) ────────────────────────
+_ITEM_TAGS = {'item', 'entry'}
+_SUMMARY_TAGS = ('summary', 'description', 'content', 'encoded')
+_DATE_TAGS = ('pubDate', 'published', 'updated', 'date', 'issued', 'modified')
+_CORE_NAMESPACES = ('http://www.w3.org/2005/Atom}', 'http://purl.org/rss/1.0/}')
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _parse_date(value):
+    """RFC 822 (RSS) ou ISO 8601 (Atom) → datetime ingênuo em UTC, como o feedparser."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _is_core(tag):
+    """Elemento do próprio formato: RSS 2.0 (sem namespace), RSS 1.0 ou Atom."""
+    return not tag.startswith('{') or tag[1:].startswith(_CORE_NAMESPACES)
+
+
+def _entry_from_element(elem):
+    # Elementos do formato têm prioridade; extensões (media:title,
+    # itunes:summary, content:encoded, dc:date...) só completam o que faltar,
+    # como no feedparser — mesmo quando aparecem antes no item
+    core, extra = {}, {}
+    links = {True: None, False: None}
+    for child in elem:
+        name, is_core = _local(child.tag), _is_core(child.tag)
+        if name == 'link':
+            href = child.get('href')
+            if href and child.get('rel', 'alternate') == 'alternate':
+                links[is_core] = links[is_core] or href
+            elif not href and child.text and child.text.strip():
+                links[is_core] = links[is_core] or child.text.strip()
+            continue
+        fields = core if is_core else extra
+        if name not in fields:
+            # Atom type="xhtml" traz o conteúdo como elementos filhos
+            fields[name] = child.text if len(child) == 0 else "".join(child.itertext())
+
+    def first(names):
+        for fields in (core, extra):
+            value = next((fields[n] for n in names if fields.get(n)), None)
+            if value:
+                return value
+        return None
+
+    # O parser XML já decodificou as entidades (uma vez, como o feedparser)
+    title = " ".join((first(('title',)) or '').split())
+    return {
+        'title': title or 'Sem título',
+        'link': links[True] or links[False] or '',
+        'raw_summary': (first(_SUMMARY_TAGS) or '').strip(),
+        'published_at': _parse_date(first(_DATE_TAGS)),
+    }
+
+
+class _StreamParser:
+    """
+    Parser incremental com XMLPullParser: recebe blocos do corpo e extrai
+    item/entry conforme fecham, limpando cada elemento depois de lido.
+    `feed()` retorna True quando já tem `limit` notícias (pode parar de baixar).
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.items = []
+        self._parser = ET.XMLPullParser(events=('start', 'end'))
+        self._depth = 0   # item/entry abertos (não conta itens aninhados)
+
+    def feed(self, data):
+        self._parser.feed(data)
+        for event, elem in self._parser.read_events():
+            if _local(elem.tag) not in _ITEM_TAGS:
+                continue
+            if event == 'start':
+                self._depth += 1
+                continue
+            self._depth -= 1
+            if self._depth == 0:
+                self.items.append(_entry_from_element(elem))
+                elem.clear()
+                if len(self.items) >= self.limit:
+                    return True
+        return False
+
+
+def _parse_with_feedparser(feed_url, body, limit, content_type=None):
+    """
+    Fallback para o que o parser incremental não entende (entidades HTML,
+    encodings, HTML). O Content-Type vai junto para o feedparser achar o
+    charset, como quando ele mesmo baixava a URL.
+    """
+    import feedparser  # só no fallback (import custa ~50ms)
+    headers = {'content-type': content_type} if content_type else None
+    feed = feedparser.parse(body, response_headers=headers)
+
+    if feed.bozo and not feed.entries:
+        # Se deu erro E não tem entradas, é um problema real
+        logger.warning(f"⚠️  Erro no feed {feed_url}: {feed.bozo_exception}")
+        return []
+    elif feed.bozo and feed.entries:
+        # Warning de formato mas tem conteúdo — ok
+        logger.info(f"⚠️  Aviso de formato (ignorado): {feed.bozo_exception}")
+
+    news_items = []
+    for entry in feed.entries[:limit]:
+        published_time = entry.get('published_parsed') or entry.get('updated_parsed')
+        pub_date = None
+        if published_time:
+            pub_date = datetime.fromtimestamp(mktime(published_time))
+
+        news_items.append({
+            'title': entry.get('title', 'Sem título'),
+            'link': entry.get('link', ''),
+            'raw_summary': entry.get('summary', entry.get('description', '')),
+            'published_at': pub_date
+        })
+    return news_items
+
+
+def _read_entries(feed_url, chunks, limit, content_type=None):
+    """
+    Consome os blocos até ter `limit` notícias (o resto do corpo nem é baixado).
+
+    Returns:
+        (news_items, body_hash) — o hash cobre só os bytes lidos, que são os
+        mesmos enquanto as primeiras `limit` notícias não mudarem
+    """
+    digest = hashlib.sha256()
+    consumed = []     # só para o fallback; para no ponto em que o parser parou
+    parser = _StreamParser(limit)
+    for data in chunks:
+        digest.update(data)
+        consumed.append(data)
+        try:
+            if parser.feed(data):
+                return parser.items, digest.hexdigest()
+        except ET.ParseError as e:
+            logger.debug(f"Parser incremental falhou em {feed_url} ({e}); usando feedparser")
+            break
+    else:
+        if parser.items:
+            return parser.items, digest.hexdigest()
+
+    # Fallback: baixa o restante (ainda limitado por MAX_FEED_BYTES) e usa o feedparser
+    for data in chunks:
+        digest.update(data)
+        consumed.append(data)
+    body = b"".join(consumed)
+    return _parse_with_feedparser(feed_url, body, limit, content_type), digest.hexdigest()
+
+
+def collect_feed_data(feed_url, limit=5, use_cache=True):
     """
     Acessa um feed RSS e retorna uma lista de dicionários com as notícias.
     Versão otimizada para Raspberry Pi:
       - Timeout configurável
       - Limite de tentativas
       - Não bloqueia em feeds lentos
+      - GET condicional (ETag / Last-Modified): feed sem mudanças
+        (304 ou mesmo hash) retorna []
+      - Download em blocos com teto (Config.MAX_FEED_BYTES) e parser
+        incremental que para em `limit` notícias: memória e CPU dependem
+        das notícias mantidas, não do tamanho do documento
     """
     logger.info(f"🔄 Conectando ao feed: {feed_url}")
     
     try:
-        # Feedparser com timeout (usa o socket timeout global)
-        feed = feedparser.parse(feed_url)
-        
-        if feed.bozo and not feed.entries:
-            # Se deu erro E não tem entradas, é um problema real
-            logger.warning(f"⚠️  Erro no feed {feed_url}: {feed.bozo_exception}")
+        validators = _get_validators(feed_url) if use_cache else {}
+        with _host_slot(feed_url), _fetch(feed_url, validators) as (status, chunks, headers):
+            if status == 304:
+                logger.info(f"💤 Sem mudanças (304): {feed_url}")
+                _fetches.inc(result='not_modified')
+                return []
+            news_items, body_hash = _read_entries(feed_url, chunks, limit,
+                                                  headers.get('Content-Type'))
+
+        unchanged = body_hash == validators.get('body_hash')
+        # Sem mudanças não há nada a processar: confirma na hora
+        _set_validators(feed_url, {
+            'etag': headers.get('ETag'),
+            'modified': headers.get('Last-Modified'),
+            'body_hash': body_hash,
+        }, pending=not unchanged)
+        if unchanged:
+            logger.info(f"💤 Sem mudanças (mesmo conteúdo): {feed_url}")
+            _fetches.inc(result='unchanged')
             return []
-        elif feed.bozo and feed.entries:
-            # Warning de formato mas tem conteúdo — ok
-            logger.info(f"⚠️  Aviso de formato (ignorado): {feed.bozo_exception}")
-
-        news_items = []
-        for entry in feed.entries[:limit]:
-            published_time = entry.get('published_parsed', entry.get('updated_parsed'))
-            pub_date = None
-            if published_time:
-                pub_date = datetime.fromtimestamp(mktime(published_time))
-            
-            item = {
-                'title': entry.get('title', 'Sem título'),
-                'link': entry.get('link', ''),
-                'raw_summary': entry.get('summary', entry.get('description', '')),
-                'published_at': pub_date
-            }
-            news_items.append(item)
-        
+        _fetches.inc(result='modified')
+
         logger.info(f"✅ {len(news_items)} notícias coletadas")
         return news_items
 
-    except socket.timeout:
-        logger.error(f"❌ Timeout ao conectar em {feed_url} ({Config.DOWNLOAD_TIMEOUT}s)")
+    except FeedTooLarge as e:
+        logger.error(f"❌ Feed grande demais, download abortado: {feed_url} ({e})")
+        _fetches.inc(result='too_large')
         return []
     except Exception as e:
+        if _is_timeout(e):
+            logger.error(f"❌ Timeout ao conectar em {feed_url} "
+                         f"({Config.FETCH_CONNECT_TIMEOUT}s/{Config.DOWNLOAD_TIMEOUT}s)")
+            _fetches.inc(result='timeout')
+            return []
         logger.error(f"❌ Erro ao coletar {feed_url}: {e}")
+        _fetches.inc(result='error')
         return []
@@ -2,10 +2,6 @@ import os
 import json
 import logging
 from pathlib import Path
-from dotenv import load_dotenv
-
-# Carrega variáveis de ambiente (.env)
-load_dotenv()
 
 class Config:
     # --- Caminhos ---
@@ -13,60 +9,163 @@ class Config:
     BASE_DIR = Path(__file__).parent.parent.absolute()
     DATA_DIR = BASE_DIR / "data"
     AUDIO_DIR = DATA_DIR / "audio"
+    AUDIO_CACHE_DIR = AUDIO_DIR / "cache"
     LOG_DIR = BASE_DIR / "logs"
     CONFIG_FILE = BASE_DIR / "feeds_config.json"
 
-    # --- Credenciais (do .env) ---
+    # --- Credenciais (do ambiente; o .env é lido em Config.setup()) ---
     TELEGRAM_TOKEN = os.getenv("BOT_TOKEN")
     TELEGRAM_CHAT_ID = os.getenv("CHAT_ID")
+    # Base da Bot API (o benchmark aponta para um servidor local)
+    TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
 
     # --- Configurações de Comportamento ---
     # Piper TTS Vozes (offline, leve)
     VOICE_PT = "pt-BR-AntonioNeural"    # não usado (piper só tem EN)
     VOICE_EN = "en_US-amy"              # modelo piper para inglês
+    # Formato do áudio enviado: "mp3" (sendAudio), "opus" (OGG/Opus, sendVoice)
+    # ou "wav". Conversões usam ffmpeg em streaming; sem ffmpeg fica o nativo.
+    AUDIO_FORMAT = "mp3"
+    AUDIO_SEGMENT_PAUSE_MS = 400  # Silêncio entre segmentos (abertura/manchetes); MP3 passa pelo ffmpeg
     
     # Limites (modo leve para Raspberry Pi)
     MAX_SUMMARY_SENTENCES = 3     # Quantas sentenças o Sumy vai gerar
+    SUMMARY_ENGINE = "sumy"       # "sumy" (LSA) ou "textrank" (NumPy, vetorizado)
+    SUMMARY_CACHE_MAX_ENTRIES = 2000  # Resumos guardados em data/summary_cache.json
+    SUMMARY_CACHE_MAX_AGE_DAYS = 14   # Resumos mais velhos que isso são descartados
     MAX_ITEMS_PER_FEED = 2        # Máximo de notícias por feed (reduzido de 3 para 2)
-    RETENTION_DAYS = 3            # Dias para manter áudios antes de apagar
+    RETENTION_DAYS = 3            # Dias sem uso antes de um áudio sair do cache
+    AUDIO_CACHE_MAX_MB = 200      # Orçamento de disco do cache de áudio (LRU)
     MAX_AUDIO_CHARS = 1200        # Máximo de caracteres para áudio (reduzido)
     
     # Otimizações de desempenho (Raspberry Pi)
-    DOWNLOAD_TIMEOUT = 15         # Timeout para download RSS (segundos)
+    DOWNLOAD_TIMEOUT = 15         # Timeout de leitura do RSS (segundos sem receber dados)
+    FETCH_CONNECT_TIMEOUT = 5     # Timeout para abrir a conexão com o servidor do feed
+    FETCH_POOL_HOSTS = 20         # Hosts com conexões keep-alive guardadas na session
+    FEED_DRAIN_BYTES = 64 * 1024  # Resto do corpo lido mesmo assim para reaproveitar a conexão
+    DNS_CACHE_TTL = 300           # Segundos que o endereço de um host de feed fica em cache
+    MAX_FEED_BYTES = 2 * 1024 * 1024  # Teto do corpo do feed (descomprimido); acima disso aborta
+    FEED_CHUNK_SIZE = 16 * 1024   # Bloco lido por vez (o parser para ao ter as notícias)
     TELEGRAM_TIMEOUT = 30         # Timeout para API Telegram (segundos)
+    TELEGRAM_GLOBAL_RATE = 30     # Mensagens/s no total (limite do bot)
+    TELEGRAM_CHAT_RATE = 1        # Mensagens/s por chat privado
+    TELEGRAM_GROUP_RATE = 20 / 60 # Mensagens/s por grupo/canal (20 por minuto)
+    TELEGRAM_MAX_RETRIES = 4      # Retentativas em 429/5xx/timeout (backoff exponencial)
+    TELEGRAM_FANOUT_WORKERS = 4   # Envios simultâneos para chats diferentes (fan-out)
+    OUTBOX_FILE = DATA_DIR / "outbox.json"  # Envios pendentes entre execuções
+    OUTBOX_MAX_AGE_HOURS = 48     # Pendências mais velhas que isso são descartadas
+    TELEGRAM_FILE_IDS_FILE = DATA_DIR / "telegram_file_ids.json"  # hash do áudio → file_id
+    TELEGRAM_FILE_ID_MAX_AGE_DAYS = 30  # file_ids guardados (reenvio sem upload)
     GC_INTERVAL = 3               # Executar garbage collection a cada N feeds
+
+    # Coleta concorrente dos feeds
+    FETCH_WORKERS = 6             # Máximo de downloads RSS simultâneos (global)
+    FETCH_PER_HOST = 2            # Máximo de downloads simultâneos no mesmo host
+    # Pipeline em estágios (fetch → prepare → tts → deliver)
+    PIPELINE_QUEUE_SIZE = 2       # Itens máximos esperando entre estágios
+    SUMMARY_WORKERS = 1           # Threads de resumo (CPU)
+    TTS_WORKERS = 3               # Feeds gerando áudio ao mesmo tempo (PT e EN em paralelo)
+    EDGE_TTS_CONCURRENCY = 2      # Jobs simultâneos no event loop do Edge-TTS
+    DELIVERY_WORKERS = 1          # Threads de envio ao Telegram
+    # Modo daemon (--daemon): cada feed no seu "interval" (minutos) do feeds_config.json
+    DAEMON_DEFAULT_INTERVAL_MIN = 60   # Intervalo de feeds sem "interval"
+    DAEMON_MIN_INTERVAL_MIN = 5        # Piso para não martelar os servidores
+    DAEMON_MAINTENANCE_HOURS = 6       # Limpeza de cache, outbox e índice de duplicatas
+    # Polling adaptativo (feeds sem "interval"): ritmo estimado pelas datas de publicação
+    FEED_STATS_FILE = DATA_DIR / "feed_stats.json"
+    POLL_MAX_INTERVAL_MIN = 720        # Teto para feeds quase parados (12h)
+    POLL_RATE_FACTOR = 0.5             # Consulta a cada meio intervalo médio entre publicações
+    POLL_EWMA_ALPHA = 0.3              # Peso dos intervalos mais recentes na média
+    POLL_JITTER = 0.1                  # ±10% para não consultar todos os feeds juntos
+    POLL_HISTORY_SIZE = 50             # Datas de publicação guardadas por feed
+    USER_AGENT = "NewsCollector/3.2 (+https://github.com/robcarv/news_colletector)"
+
+    # Cache de GET condicional (ETag / Last-Modified / hash do corpo)
+    FEED_CACHE_FILE = DATA_DIR / "feed_cache.json"
+    SUMMARY_CACHE_FILE = DATA_DIR / "summary_cache.json"
     
-    # Histórico
+    # Histórico (SQLite em data/history.db; history.json é só exportação)
+    HISTORY_DB = DATA_DIR / "history.db"
     HISTORY_FILE = BASE_DIR / "history.json"
-    MAX_HISTORY = 200             # Máximo de títulos no histórico
+    MAX_HISTORY = 200             # Itens exportados para history.json (portfolio)
+
+    # Deduplicação (índice exato + bigramas, ver src/dedupe.py)
+    DEDUPE_MAX_TITLES = 20000     # Títulos mantidos no banco/índice de duplicatas
+    DEDUPE_SIMILARITY = 0.8       # Fração de bigramas em comum para ser "mesma notícia"
+    DEDUPE_MIN_SHINGLES = 3       # Títulos menores só casam por igualdade exata
+    DEDUPE_MAX_POSTING = 200      # Bigramas mais comuns que isso são ignorados na busca
+
+    # Métricas da execução (JSON + textfile do node_exporter, ver src/metrics.py)
+    METRICS_FILE = DATA_DIR / "metrics.json"
+    METRICS_PROM_FILE = Path(os.getenv("METRICS_PROM_FILE", DATA_DIR / "newsbot.prom"))
+
+    # Inicialização
+    STARTUP_BUDGET_MS = 200       # Orçamento de import do main.py no Pi (--startup-profile)
+
+    @staticmethod
+    def setup():
+        """
+        Efeitos colaterais da inicialização, fora do import: lê o .env,
+        cria as pastas e configura o log (arquivo + console).
+        Chamado uma vez pelo ponto de entrada (main.py).
+        """
+        from dotenv import load_dotenv
+
+        # Carrega variáveis de ambiente (.env)
+        load_dotenv()
+        Config.TELEGRAM_TOKEN = os.getenv("BOT_TOKEN")
+        Config.TELEGRAM_CHAT_ID = os.getenv("CHAT_ID")
+        Config.TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", Config.TELEGRAM_API_URL)
+        Config.METRICS_PROM_FILE = Path(os.getenv("METRICS_PROM_FILE", Config.METRICS_PROM_FILE))
+
+        Config.setup_folders()
+
+        # Configuração de Log Global
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.FileHandler(Config.LOG_DIR / "app.log"),
+                logging.StreamHandler()
+            ]
+        )
 
     @staticmethod
     def setup_folders():
         """Garante que as pastas necessárias existem"""
         Config.DATA_DIR.mkdir(exist_ok=True)
         Config.AUDIO_DIR.mkdir(exist_ok=True)
+        Config.AUDIO_CACHE_DIR.mkdir(exist_ok=True)
         Config.LOG_DIR.mkdir(exist_ok=True)
 
     @staticmethod
     def load_feeds():
-        """Carrega a lista de RSS do arquivo JSON"""
+        """
+        Carrega a lista de RSS do arquivo JSON.
+
+        Aceita a lista simples de feeds ou um objeto com rotas de entrega:
+            {"routes": {"pt": ["@canal_pt"], "en": ["@canal_en"], "default": [...]},
+             "feeds": [{"url": ..., "language": ..., "name": ..., "chats": [...]}]}
+        Cada feed sai com `chats` resolvido: os do próprio feed, senão a rota
+        do idioma, senão a rota "default", senão Config.TELEGRAM_CHAT_ID.
+        """
         if not Config.CONFIG_FILE.exists():
             logging.error(f"Arquivo de configuração não encontrado: {Config.CONFIG_FILE}")
             return []
             
         try:
             with open(Config.CONFIG_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+                data = json.load(f)
         except Exception as e:
             logging.error(f"Erro ao ler feeds_config.json: {e}")
             return []
 
-# Configuração de Log Global
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(Config.LOG_DIR / "app.log"),
-        logging.StreamHandler()
-    ]
-)
\ No newline at end of file
+        if isinstance(data, dict):
+            feeds, routes = data.get('feeds', []), data.get('routes', {})
+        else:
+            feeds, routes = data, {}
+        default = routes.get('default') or ([Config.TELEGRAM_CHAT_ID] if Config.TELEGRAM_CHAT_ID else [])
+        for feed in feeds:
+            chats = feed.get('chats') or routes.get(feed.get('language', 'en')) or default
+            feed['chats'] = [str(c) for c in ([chats] if isinstance(chats, (str, int)) else chats)]
+        return feeds
@@ -0,0 +1,98 @@
+import hashlib
+import logging
+import re
+import threading
+
+from .config import Config
+from .processor import clean_html
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_title(title):
+    """Título em minúsculas, sem HTML e sem pontuação — só as palavras."""
+    return _WORD_RE.findall(clean_html(title or "").lower())
+
+
+def words_hash(words):
+    """Hash das palavras de um título normalizado (hex, 128 bits)."""
+    return hashlib.blake2b(" ".join(words).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def title_hash(title):
+    """Hash do título normalizado: chave exata do DedupeIndex e do histórico (SQLite)."""
+    return words_hash(normalize_title(title))
+
+
+def _shingles(words):
+    """Bigramas de palavras (ou a própria palavra, em títulos de 1 palavra)."""
+    if len(words) < 2:
+        return {hash(w) for w in words}
+    return {hash((a, b)) for a, b in zip(words, words[1:])}
+
+
+class DedupeIndex:
+    """
+    Índice de títulos já vistos.
+
+    - Exato: hash do título normalizado (set → O(1))
+    - Aproximado: índice invertido de bigramas de palavras. Um título novo é
+      duplicado se >= Config.DEDUPE_SIMILARITY dos bigramas do menor título
+      aparecem no outro (pega manchetes reescritas ou com sufixo " - BBC").
+      Bigramas muito comuns (listas > Config.DEDUPE_MAX_POSTING) são
+      ignorados na busca, então o custo por título fica ~constante mesmo
+      com dezenas de milhares de títulos no índice.
+    """
+
+    def __init__(self, titles=()):
+        self._exact = set()
+        self._sizes = []       # doc_id -> nº de bigramas
+        self._postings = {}    # bigrama -> [doc_id, ...]
+        self._lock = threading.Lock()
+        for title in titles:
+            self.add(title)
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def add(self, title):
+        words = normalize_title(title)
+        if not words:
+            return
+        shingles = _shingles(words)
+        with self._lock:
+            self._exact.add(words_hash(words))
+            doc_id = len(self._sizes)
+            self._sizes.append(len(shingles))
+            for sh in shingles:
+                self._postings.setdefault(sh, []).append(doc_id)
+
+    def is_duplicate(self, title):
+        words = normalize_title(title)
+        if not words:
+            return False
+        with self._lock:
+            if words_hash(words) in self._exact:
+                return True
+
+            shingles = _shingles(words)
+            if len(shingles) < Config.DEDUPE_MIN_SHINGLES:
+                return False
+
+            overlap = {}
+            for sh in shingles:
+                docs = self._postings.get(sh)
+                if not docs or len(docs) > Config.DEDUPE_MAX_POSTING:
+                    continue
+                for doc_id in docs:
+                    overlap[doc_id] = overlap.get(doc_id, 0) + 1
+
+            for doc_id, shared in overlap.items():
+                smaller = min(len(shingles), self._sizes[doc_id])
+                if smaller >= Config.DEDUPE_MIN_SHINGLES and \
+                        shared / smaller >= Config.DEDUPE_SIMILARITY:
+                    return True
+        return False
+
@@ -0,0 +1,147 @@
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+
+from .config import Config
+from .dedupe import title_hash
+from .storage import load_json, save_json
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    title      TEXT NOT NULL,
+    title_hash TEXT NOT NULL,
+    link       TEXT,
+    source     TEXT,
+    summary    TEXT,
+    date       TEXT,
+    image      TEXT,
+    added_at   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_title_hash ON items(title_hash);
+CREATE INDEX IF NOT EXISTS idx_items_link ON items(link);
+CREATE INDEX IF NOT EXISTS idx_items_date ON items(date);
+"""
+
+_FIELDS = ('title', 'summary', 'link', 'source', 'date', 'image')
+
+
+class HistoryStore:
+    """
+    Histórico de notícias em SQLite (data/history.db).
+
+    - Aberto uma vez por execução, inserções O(1) numa transação
+    - Busca indexada por hash do título (o mesmo do DedupeIndex) e link
+    - Modo WAL: um crash no meio da gravação não corrompe o banco
+    - history.json continua existindo como exportação (portfolio)
+    """
+
+    def __init__(self, path=None):
+        self.path = path or Config.HISTORY_DB
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate_json()
+        self._rehash_titles()
+
+    def _migrate_json(self):
+        """Primeira execução: importa o history.json antigo."""
+        if self.count() or not Config.HISTORY_FILE.exists():
+            return
+        legacy = load_json(Config.HISTORY_FILE, default=[]) or []
+        records = [{'title': h} if isinstance(h, str) else h for h in legacy]
+        self.add_many(records)
+        logger.info(f"📦 Histórico migrado de {Config.HISTORY_FILE.name}: {len(records)} itens")
+
+    def _rehash_titles(self):
+        """Bancos antigos guardavam sha1 do título; passa para o title_hash atual."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, title FROM items WHERE length(title_hash) != 32").fetchall()
+            if not rows:
+                return
+            with self._conn:
+                self._conn.executemany("UPDATE items SET title_hash = ? WHERE id = ?",
+                                       [(title_hash(r['title']), r['id']) for r in rows])
+        logger.info(f"🔑 Histórico: {len(rows)} hashes de título atualizados")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def add_many(self, records):
+        """Insere vários registros numa única transação."""
+        now = datetime.now().isoformat()
+        rows = [
+            (r.get('title', ''), title_hash(r.get('title', '')), r.get('link', ''),
+             r.get('source', ''), r.get('summary', ''), r.get('date', ''),
+             r.get('image', ''), now)
+            for r in records if r.get('title')
+        ]
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO items (title, title_hash, link, source, summary, date, image, added_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def has_title(self, title):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM items WHERE title_hash = ? LIMIT 1", (title_hash(title),)).fetchone()
+        return row is not None
+
+    def has_link(self, link):
+        if not link:
+            return False
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM items WHERE link = ? LIMIT 1", (link,)).fetchone()
+        return row is not None
+
+    def titles(self, limit):
+        """Últimos `limit` títulos (mais antigos primeiro)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT title FROM (SELECT id, title FROM items ORDER BY id DESC LIMIT ?) "
+                "ORDER BY id", (limit,)).fetchall()
+        return [r['title'] for r in rows]
+
+    def recent(self, limit):
+        """Últimos `limit` registros no formato do history.json."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM (SELECT * FROM items ORDER BY id DESC LIMIT ?) "
+                "ORDER BY id", (limit,)).fetchall()
+        return [self._record(r) for r in rows]
+
+    def prune(self, keep):
+        """Mantém só os `keep` registros mais recentes."""
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "DELETE FROM items WHERE id <= (SELECT id FROM items ORDER BY id DESC "
+                "LIMIT 1 OFFSET ?)", (keep,))
+        return cur.rowcount
+
+    def export_json(self, path=None, limit=None):
+        """Exporta os últimos registros para history.json (gravação atômica)."""
+        path = path or Config.HISTORY_FILE
+        records = self.recent(limit or Config.MAX_HISTORY)
+        save_json(path, records)
+        return len(records)
+
+    @staticmethod
+    def _record(row):
+        return {field: row[field] or '' for field in _FIELDS}
@@ -0,0 +1,188 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from .config import Config
+from .storage import save_json, save_text
+
+logger = logging.getLogger(__name__)
+
+# Limites (segundos) dos buckets de latência: de leitura de cache a upload lento
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _prometheus_header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Contador que só cresce (ex: bytes baixados, itens processados)."""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def to_dict(self):
+        with self._lock:
+            return [{'labels': dict(k), 'value': v} for k, v in self._values.items()]
+
+    def to_prometheus(self):
+        lines = self._prometheus_header()
+        with self._lock:
+            lines += [f"{self.name}{_format_labels(k)} {v}" for k, v in self._values.items()]
+        return lines
+
+
+class Gauge(Counter):
+    """Valor instantâneo (ex: taxa de acerto do cache, utilização de estágio)."""
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Distribuição de valores em buckets cumulativos (como o Prometheus)."""
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = {'counts': [0] * len(self.buckets), 'count': 0, 'sum': 0.0, 'max': 0.0}
+                self._values[key] = entry
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['counts'][i] += 1
+            entry['count'] += 1
+            entry['sum'] += value
+            entry['max'] = max(entry['max'], value)
+
+    def to_dict(self):
+        with self._lock:
+            return [{
+                'labels': dict(k),
+                'count': e['count'],
+                'sum': round(e['sum'], 6),
+                'avg': round(e['sum'] / e['count'], 6) if e['count'] else 0.0,
+                'max': round(e['max'], 6),
+                'buckets': {str(b): c for b, c in zip(self.buckets, e['counts'])},
+            } for k, e in self._values.items()]
+
+    def to_prometheus(self):
+        lines = self._prometheus_header()
+        with self._lock:
+            for k, e in self._values.items():
+                for bound, count in zip(self.buckets, e['counts']):
+                    lines.append(f"{self.name}_bucket{_format_labels(k, [('le', bound)])} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels(k, [('le', '+Inf')])} {e['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(k)} {e['sum']}")
+                lines.append(f"{self.name}_count{_format_labels(k)} {e['count']}")
+        return lines
+
+
+class Registry:
+    """
+    Métricas da execução, exportadas no fim em JSON (Config.METRICS_FILE) e
+    no formato textfile do node_exporter (Config.METRICS_PROM_FILE).
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help_text, **kwargs)
+                self._metrics[name] = metric
+            return metric
+
+    def counter(self, name, help_text=""):
+        return self._get(Counter, name, help_text)
+
+    def gauge(self, name, help_text=""):
+        return self._get(Gauge, name, help_text)
+
+    def histogram(self, name, help_text="", buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help_text, buckets=buckets)
+
+    def to_dict(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {'generated_at': time.time(),
+                **{kind: {m.name: m.to_dict() for m in metrics if m.kind == kind}
+                   for kind in ('counter', 'gauge', 'histogram')}}
+
+    def to_prometheus(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines += metric.to_prometheus()
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path=None, prom_path=None):
+        """Grava os dois formatos (atômico: o node_exporter nunca lê arquivo pela metade)."""
+        json_path = json_path or Config.METRICS_FILE
+        prom_path = prom_path or Config.METRICS_PROM_FILE
+        save_json(json_path, self.to_dict(), indent=1)
+        save_text(prom_path, self.to_prometheus())
+        logger.info(f"📈 Métricas: {json_path} e {prom_path}")
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram('newsbot_stage_seconds', "Duração de cada etapa por feed (segundos)")
+
+
+@contextmanager
+def timed(stage, **labels):
+    """Mede o bloco no histograma newsbot_stage_seconds{stage=...}."""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.monotonic() - start, stage=stage, **labels)
+
+
+def counter(name, help_text=""):
+    return registry.counter(name, help_text)
+
+
+def gauge(name, help_text=""):
+    return registry.gauge(name, help_text)
@@ -1,36 +1,432 @@
+import hashlib
 import logging
 import os
-import requests
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from .cache import DiskCache
 from .config import Config
+from .metrics import STAGE_SECONDS, counter
+from .storage import load_json, save_json
 
 logger = logging.getLogger(__name__)
 
 # ─── Sessão HTTP reutilizável (conexão persistente, mais rápido) ──────────
-_session = requests.Session()
-# Timeout é passado em cada chamada, não na session
+# Criada no primeiro envio: requests não entra no import (dry-run não envia nada)
+_session = None
+_session_lock = threading.Lock()
 
-def _telegram_request(method, url, **kwargs):
-    """Wrapper para chamadas à API do Telegram com tratamento de erro."""
+
+def _get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            _session = requests.Session()
+            # Timeout é passado em cada chamada, não na session
+        return _session
+
+_requests = counter('newsbot_telegram_requests_total', "Chamadas à Bot API por método e status")
+_upload_bytes = counter('newsbot_upload_bytes_total', "Bytes de áudio enviados ao Telegram")
+_reused_bytes = counter('newsbot_upload_saved_bytes_total', "Bytes não enviados graças ao file_id")
+
+# Estatísticas de upload da execução (para o resumo final)
+_upload_stats = {'files': 0, 'bytes': 0, 'seconds': 0.0, 'reused': 0, 'bytes_saved': 0}
+_upload_stats_lock = threading.Lock()
+
+
+def get_upload_stats():
+    with _upload_stats_lock:
+        return dict(_upload_stats)
+
+
+# Latência de entrega por chat (inclui espera no limitador e retentativas)
+_delivery_stats = {}
+
+
+def _record_delivery(chat_id, ok, seconds):
+    with _upload_stats_lock:
+        st = _delivery_stats.setdefault(str(chat_id), {'sent': 0, 'failed': 0, 'seconds': 0.0, 'max': 0.0})
+        st['sent' if ok else 'failed'] += 1
+        st['seconds'] += seconds
+        st['max'] = max(st['max'], seconds)
+
+
+def get_delivery_stats():
+    """Por chat: enviados, falhas, latência média e máxima (segundos)."""
+    with _upload_stats_lock:
+        return {chat: dict(st, avg=st['seconds'] / max(1, st['sent'] + st['failed']))
+                for chat, st in _delivery_stats.items()}
+
+
+# ─── Limite de taxa (token bucket) ─────────────────────────────────────────
+
+class TokenBucket:
+    """
+    Token bucket bloqueante: `rate` envios por segundo, rajada de até `capacity`.
+    `clock`/`sleep` podem ser trocados (testes com relógio simulado).
+    """
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+# Limites do Telegram: ~30 msg/s no total, 1 msg/s por chat e 20 msg/min em grupos
+_global_bucket = TokenBucket(Config.TELEGRAM_GLOBAL_RATE, capacity=Config.TELEGRAM_GLOBAL_RATE)
+_chat_buckets = {}
+_chat_buckets_lock = threading.Lock()
+
+
+def _wait_turn(chat_id):
+    """Bloqueia até poder enviar mais uma mensagem para `chat_id`."""
+    with _chat_buckets_lock:
+        bucket = _chat_buckets.get(chat_id)
+        if bucket is None:
+            # Grupos/canais: id negativo ou @username (só canais públicos têm @)
+            is_group = str(chat_id).startswith(('-', '@'))
+            rate = Config.TELEGRAM_GROUP_RATE if is_group else Config.TELEGRAM_CHAT_RATE
+            bucket = TokenBucket(rate)
+            _chat_buckets[chat_id] = bucket
+    bucket.acquire()
+    _global_bucket.acquire()
+
+
+# ─── Upload multipart em streaming ─────────────────────────────────────────
+
+class _MultipartUpload:
+    """
+    Corpo multipart/form-data lido do disco em blocos.
+
+    O `files=` do requests monta o corpo inteiro na memória antes de enviar;
+    aqui só o cabeçalho dos campos fica em memória e o arquivo é lido aos
+    poucos conforme a conexão pede, então o consumo é fixo qualquer que seja
+    o tamanho do WAV. `__len__` dá o Content-Length (sem chunked encoding).
+    """
+
+    CHUNK = 64 * 1024
+    PROGRESS_STEP = 0.25  # Loga a cada 25% enviados
+
+    def __init__(self, fields, field, filename, path):
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self.path = Path(path)
+        self.size = self.path.stat().st_size
+        head = []
+        for name, value in fields.items():
+            head.append(f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"'
+                        f'\r\n\r\n{value}\r\n')
+        safe_name = filename.replace('"', '')
+        head.append(f'--{self.boundary}\r\nContent-Disposition: form-data; name="{field}"; '
+                    f'filename="{safe_name}"\r\nContent-Type: application/octet-stream\r\n\r\n')
+        self._head = "".join(head).encode('utf-8')
+        self._tail = f'\r\n--{self.boundary}--\r\n'.encode('ascii')
+        self._file = None
+        self._stage = 0  # 0 = cabeçalho, 1 = arquivo, 2 = fechamento, 3 = fim
+        self._offset = 0
+        self.sent = 0
+        self._next_log = self.PROGRESS_STEP
+        self._start = None
+
+    def __len__(self):
+        return len(self._head) + self.size + len(self._tail)
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.CHUNK)
+            if not chunk:
+                return
+            yield chunk
+
+    def read(self, n=-1):
+        if self._start is None:
+            self._start = time.monotonic()
+        if n is None or n < 0:
+            n = len(self)
+        out = b''
+        while len(out) < n and self._stage < 3:
+            if self._stage == 1:
+                if self._file is None:
+                    self._file = open(self.path, 'rb')
+                data = self._file.read(n - len(out))
+                if not data:
+                    self._file.close()
+                    self._file = None
+                    self._stage, self._offset = 2, 0
+                    continue
+                out += data
+                self._progress(len(data))
+                continue
+            part = self._head if self._stage == 0 else self._tail
+            data = part[self._offset:self._offset + n - len(out)]
+            out += data
+            self._offset += len(data)
+            if self._offset >= len(part):
+                self._stage, self._offset = self._stage + 1, 0
+        return out
+
+    def _progress(self, nbytes):
+        self.sent += nbytes
+        if self.size and self.sent / self.size >= self._next_log:
+            elapsed = max(time.monotonic() - self._start, 1e-6)
+            logger.info(f"📤 {self.sent / self.size:.0%} de {self.size//1024}KB "
+                        f"({self.sent / 1024 / elapsed:.0f}KB/s)")
+            while self._next_log <= self.sent / self.size:
+                self._next_log += self.PROGRESS_STEP
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# ─── Requisições com retry ─────────────────────────────────────────────────
+
+def _backoff(attempt):
+    """Espera exponencial com jitter: 1s, 2s, 4s... (máx. 60s)."""
+    return min(60, 2 ** attempt) * (0.5 + random.random() / 2)
+
+
+def _telegram_request(api_method, chat_id, data=None, upload=None):
+    """
+    Chama a API do Telegram respeitando o limite de taxa.
+    `upload` = (campo, nome, caminho) envia um arquivo em streaming (multipart).
+
+    Faz retry com backoff exponencial em timeouts, erros de conexão e 5xx,
+    e espera exatamente o `retry_after` informado num 429.
+
+    Returns:
+        (resposta JSON ou None, retryable, descrição do erro) — retryable=False
+        em erros definitivos (ex: 400 Markdown inválido), que não vão para o outbox
+    """
+    import requests
+
+    session = _get_session()
+    url = f"{Config.TELEGRAM_API_URL.rstrip('/')}/bot{Config.TELEGRAM_TOKEN}/{api_method}"
+    for attempt in range(Config.TELEGRAM_MAX_RETRIES + 1):
+        _wait_turn(chat_id)
+        body_stream = None
+        try:
+            if upload:
+                # Corpo novo a cada tentativa (o anterior já foi consumido)
+                body_stream = _MultipartUpload(data or {}, *upload)
+                resp = session.post(url, data=body_stream, timeout=Config.TELEGRAM_TIMEOUT,
+                                     headers={'Content-Type': body_stream.content_type})
+            else:
+                resp = session.post(url, data=data, timeout=Config.TELEGRAM_TIMEOUT)
+            _requests.inc(method=api_method, status=resp.status_code)
+            try:
+                body = resp.json()
+            except ValueError:
+                body = {}
+            if resp.status_code == 429:
+                retry_after = body.get('parameters', {}).get('retry_after', 1)
+                logger.warning(f"🚦 Telegram 429: aguardando {retry_after}s")
+                time.sleep(retry_after)
+                continue
+            if resp.status_code >= 500:
+                logger.warning(f"⚠️  Telegram {resp.status_code} (tentativa {attempt + 1})")
+            elif resp.ok and body.get('ok'):
+                return body, False, None
+            else:
+                description = body.get('description', '')
+                logger.error(f"❌ Erro Telegram {resp.status_code}: {description}")
+                return None, False, description
+        except requests.exceptions.Timeout:
+            logger.error("⏱️  Timeout na API Telegram")
+            _requests.inc(method=api_method, status='timeout')
+        except requests.exceptions.ConnectionError:
+            logger.error("🔌 Erro de conexão com Telegram")
+            _requests.inc(method=api_method, status='connection_error')
+        finally:
+            if body_stream is not None:
+                body_stream.close()
+        if attempt < Config.TELEGRAM_MAX_RETRIES:
+            time.sleep(_backoff(attempt))
+    return None, True, None
+
+
+# ─── Outbox persistente ────────────────────────────────────────────────────
+# Envios que falharam por erro temporário ficam em data/outbox.json e são
+# reenviados por flush_outbox() na próxima execução.
+_outbox_lock = threading.Lock()
+
+
+def _outbox_add(job):
+    with _outbox_lock:
+        jobs = load_json(Config.OUTBOX_FILE, default=[]) or []
+        job = dict(job, id=uuid.uuid4().hex, queued_at=time.time())
+        jobs.append(job)
+        save_json(Config.OUTBOX_FILE, jobs)
+    logger.warning(f"📮 {job['kind']} guardado no outbox para reenvio")
+
+
+def outbox_paths():
+    """Arquivos de áudio que envios pendentes do outbox ainda vão usar."""
+    with _outbox_lock:
+        jobs = load_json(Config.OUTBOX_FILE, default=[]) or []
+    return [job['path'] for job in jobs if job.get('path')]
+
+
+def flush_outbox():
+    """Reenvia o que ficou no outbox. Retorna quantos foram entregues."""
+    with _outbox_lock:
+        jobs = load_json(Config.OUTBOX_FILE, default=[]) or []
+        if not jobs:
+            return 0
+        logger.info(f"📮 Outbox: {len(jobs)} envio(s) pendente(s)")
+        max_age = Config.OUTBOX_MAX_AGE_HOURS * 3600
+        pending, sent = [], 0
+        for job in jobs:
+            if time.time() - job.get('queued_at', 0) > max_age:
+                logger.warning(f"🗑️  Outbox: descartando {job['kind']} antigo")
+                continue
+            ok, retryable = _deliver(job)
+            if ok:
+                sent += 1
+            elif retryable:
+                pending.append(job)
+        save_json(Config.OUTBOX_FILE, pending)
+    return sent
+
+
+# ─── file_id do Telegram ───────────────────────────────────────────────────
+# Todo áudio enviado ganha um file_id no Telegram. Guardamos hash do conteúdo
+# → file_id: o mesmo áudio (ex: episódio vindo do cache) é reenviado só com
+# o file_id, sem subir os bytes de novo.
+file_ids = DiskCache(Config.TELEGRAM_FILE_IDS_FILE, max_entries=5000,
+                     max_age_days=Config.TELEGRAM_FILE_ID_MAX_AGE_DAYS)
+
+# Erros que indicam file_id inválido/expirado (aí vale subir o arquivo de novo)
+_BAD_FILE_ID_ERRORS = ('wrong file identifier', 'wrong remote file identifier',
+                       'file reference', 'file_id', 'wrong type of the web page content')
+
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _extract_file_id(body):
+    result = body.get('result') or {}
+    for field in ('audio', 'voice', 'document'):
+        if isinstance(result.get(field), dict) and result[field].get('file_id'):
+            return result[field]['file_id']
+    return None
+
+
+# ─── Envio ─────────────────────────────────────────────────────────────────
+
+def _deliver(job):
+    """Executa um job ('message' ou 'audio'). Returns (ok, retryable)."""
+    if job['kind'] == 'message':
+        payload = {
+            "chat_id": job['chat_id'],
+            "text": job['text'],
+            "parse_mode": "Markdown"
+        }
+        body, retryable, _ = _telegram_request('sendMessage', job['chat_id'], data=payload)
+        return body is not None, retryable
+
+    audio_path = job['path']
+    if not os.path.exists(audio_path):
+        logger.error(f"Arquivo não encontrado: {audio_path}")
+        return False, False
+
+    # OGG/Opus vai como mensagem de voz; MP3/WAV como arquivo de áudio
+    is_voice = audio_path.lower().endswith(('.ogg', '.opus'))
+    method, field = ('sendVoice', 'voice') if is_voice else ('sendAudio', 'audio')
+    data = {
+        'chat_id': job['chat_id'],
+        'caption': job['caption'],
+        'parse_mode': 'Markdown',
+    }
+    if not is_voice:
+        data['title'] = job['title']
+
+    size = os.path.getsize(audio_path)
+    digest = _file_digest(audio_path)
+
+    # Telegram já tem esse áudio: envia só o file_id (requisição de poucos bytes)
+    file_id = file_ids.get(digest)
+    if file_id:
+        body, retryable, error = _telegram_request(method, job['chat_id'], data=dict(data, **{field: file_id}))
+        if body is not None:
+            logger.info(f"♻️  Áudio reenviado por file_id ({size//1024}KB não enviados)")
+            with _upload_stats_lock:
+                _upload_stats['reused'] += 1
+                _upload_stats['bytes_saved'] += size
+            _reused_bytes.inc(size)
+            return True, False
+        if retryable or not any(e in (error or '').lower() for e in _BAD_FILE_ID_ERRORS):
+            return False, retryable
+        logger.warning("⚠️  file_id recusado pelo Telegram, enviando o arquivo de novo")
+        file_ids.delete(digest)
+        file_ids.save()
+
+    upload = (field, job.get('filename') or os.path.basename(audio_path), audio_path)
+    logger.info(f"📤 Enviando áudio ({size//1024}KB)...")
+    start = time.monotonic()
+    body, retryable, _ = _telegram_request(method, job['chat_id'], data=data, upload=upload)
+    if body is None:
+        return False, retryable
+
+    elapsed = time.monotonic() - start
+    with _upload_stats_lock:
+        _upload_stats['files'] += 1
+        _upload_stats['bytes'] += size
+        _upload_stats['seconds'] += elapsed
+    _upload_bytes.inc(size)
+    STAGE_SECONDS.observe(elapsed, stage='upload')
+    new_id = _extract_file_id(body)
+    if new_id:
+        file_ids.set(digest, new_id)
+        file_ids.save()
+    return True, False
+
+
+def _send(job):
+    start = time.monotonic()
     try:
-        resp = _session.request(method, url, timeout=Config.TELEGRAM_TIMEOUT, **kwargs)
-        resp.raise_for_status()
-        return True
-    except requests.exceptions.Timeout:
-        logger.error("⏱️  Timeout na API Telegram")
-        return False
-    except requests.exceptions.ConnectionError:
-        logger.error("🔌 Erro de conexão com Telegram")
-        return False
+        ok, retryable = _deliver(job)
     except Exception as e:
-        logger.error(f"❌ Erro Telegram: {e}")
-        return False
+        logger.error(f"❌ Erro ao enviar {job['kind']}: {e}")
+        ok, retryable = False, True
+    _record_delivery(job['chat_id'], ok, time.monotonic() - start)
+    if not ok and retryable:
+        _outbox_add(job)
+    return ok
 
 
-def send_telegram_message(message):
+def send_telegram_message(message, chat_id=None):
     """
-    Envia uma mensagem de texto para o Telegram.
+    Envia uma mensagem de texto para o Telegram (padrão: Config.TELEGRAM_CHAT_ID).
     """
-    if not Config.TELEGRAM_TOKEN or not Config.TELEGRAM_CHAT_ID:
+    chat_id = chat_id or Config.TELEGRAM_CHAT_ID
+    if not Config.TELEGRAM_TOKEN or not chat_id:
         logger.warning("Credenciais do Telegram não configuradas.")
         return False
 
@@ -38,44 +434,69 @@ def send_telegram_message(message):
     if len(message) > 4000:
         message = message[:3997] + "..."
 
-    url = f"https://api.telegram.org/bot{Config.TELEGRAM_TOKEN}/sendMessage"
-    payload = {
-        "chat_id": Config.TELEGRAM_CHAT_ID,
-        "text": message,
-        "parse_mode": "Markdown"
-    }
-    
-    return _telegram_request("POST", url, data=payload)
+    return _send({'kind': 'message', 'chat_id': chat_id, 'text': message})
 
 
-def send_telegram_audio(audio_path, caption, title=None):
+def send_telegram_audio(audio_path, caption, title=None, filename=None, chat_id=None):
     """
     Envia arquivo de áudio com legenda para o Telegram.
     Usa sessão reutilizável para evitar overhead de conexão.
+    `filename` é o nome mostrado no Telegram (padrão: nome do arquivo).
     """
     if not os.path.exists(audio_path):
         logger.error(f"Arquivo não encontrado: {audio_path}")
         return False
 
-    url = f"https://api.telegram.org/bot{Config.TELEGRAM_TOKEN}/sendAudio"
-    
     if not title:
         title = caption.split('\n')[0].replace('*', '').strip()[:256]
-    
+
     if len(caption) > 1000:
         caption = caption[:997] + "..."
 
-    try:
-        with open(audio_path, 'rb') as audio_file:
-            files = {'audio': audio_file}
-            data = {
-                'chat_id': Config.TELEGRAM_CHAT_ID,
-                'caption': caption,
-                'parse_mode': 'Markdown',
-                'title': title[:256],
-            }
-            logger.info(f"📤 Enviando áudio ({os.path.getsize(audio_path)//1024}KB)...")
-            return _telegram_request("POST", url, files=files, data=data)
-    except Exception as e:
-        logger.error(f"❌ Erro ao enviar áudio: {e}")
-        return False
+    return _send({
+        'kind': 'audio',
+        'chat_id': chat_id or Config.TELEGRAM_CHAT_ID,
+        'path': str(audio_path),
+        'caption': caption,
+        'title': title[:256],
+        'filename': filename,
+    })
+
+
+# ─── Vários destinos ───────────────────────────────────────────────────────
+
+def _fan_out(send, chats):
+    """Chama send(chat) em paralelo; o limitador de taxa segura cada chat."""
+    if not chats:
+        return {}
+    workers = min(len(chats), Config.TELEGRAM_FANOUT_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fanout") as pool:
+        return dict(zip(chats, pool.map(send, chats)))
+
+
+def broadcast_message(message, chats):
+    """Envia a mesma mensagem para vários chats. Returns {chat: ok}."""
+    return _fan_out(lambda chat: send_telegram_message(message, chat_id=chat), list(chats))
+
+
+def broadcast_audio(audio_path, caption, chats, title=None, filename=None):
+    """
+    Envia o mesmo áudio para vários chats com um único upload: o primeiro
+    envio que der certo grava o file_id, e os demais chats recebem só o
+    file_id, em paralelo.
+
+    Returns:
+        {chat: ok}
+    """
+    def send(chat):
+        return send_telegram_audio(audio_path, caption, title=title, filename=filename, chat_id=chat)
+
+    pending = list(chats)
+    results = {}
+    while pending:
+        chat = pending.pop(0)
+        results[chat] = send(chat)
+        if results[chat]:
+            break
+    results.update(_fan_out(send, pending))
+    return results
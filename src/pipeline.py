@@ -0,0 +1,137 @@
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Marca de fim de fluxo entre estágios
+_DONE = object()
+
+
+class Stage:
+    """
+    Um estágio do pipeline.
+
+    Args:
+        name: Nome usado nos logs/estatísticas (ex: 'fetch', 'tts')
+        func: Função item -> próximo item. Retornar None descarta o item.
+        workers: Quantas threads processam este estágio em paralelo
+        queue_size: Tamanho máximo da fila de entrada (limita a memória)
+    """
+
+    def __init__(self, name, func, workers=1, queue_size=2):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+        self._alive = self.workers
+
+    def _record(self, elapsed, ok):
+        with self._lock:
+            self.busy_seconds += elapsed
+            if ok:
+                self.processed += 1
+            else:
+                self.failed += 1
+
+    def _worker_finished(self):
+        """Retorna True se este era o último worker vivo do estágio."""
+        with self._lock:
+            self._alive -= 1
+            return self._alive == 0
+
+
+class Pipeline:
+    """
+    Pipeline em estágios ligados por filas limitadas.
+
+    Cada estágio roda em suas próprias threads, então rede (fetch/upload),
+    CPU (resumo/TTS) e disco trabalham ao mesmo tempo em feeds diferentes.
+    A memória fica limitada pela soma dos tamanhos das filas.
+    """
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+        self.results = []
+        self.wall_seconds = 0.0
+        self._results_lock = threading.Lock()
+
+    def _run_worker(self, index):
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+
+        while True:
+            item = stage.queue.get()
+            if item is _DONE:
+                break
+            start = time.monotonic()
+            try:
+                result = stage.func(item)
+                ok = True
+            except Exception as e:
+                logger.error(f"❌ Estágio {stage.name}: {e}")
+                result, ok = None, False
+            stage._record(time.monotonic() - start, ok)
+
+            if result is None:
+                continue
+            if next_stage is not None:
+                next_stage.queue.put(result)
+            else:
+                with self._results_lock:
+                    self.results.append(result)
+
+        # Último worker a sair propaga o fim de fluxo para o próximo estágio
+        if stage._worker_finished() and next_stage is not None:
+            for _ in range(next_stage.workers):
+                next_stage.queue.put(_DONE)
+
+    def run(self, items):
+        """Processa todos os itens e retorna as saídas do último estágio."""
+        start = time.monotonic()
+        threads = []
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                t = threading.Thread(target=self._run_worker, args=(index,),
+                                     name=f"{stage.name}-{n}", daemon=True)
+                t.start()
+                threads.append(t)
+
+        first = self.stages[0]
+        for item in items:
+            first.queue.put(item)  # bloqueia se a fila estiver cheia
+        for _ in range(first.workers):
+            first.queue.put(_DONE)
+
+        for t in threads:
+            t.join()
+        self.wall_seconds = time.monotonic() - start
+        return self.results
+
+    def stats(self):
+        """Utilização por estágio: tempo ocupado / (tempo total x workers)."""
+        report = []
+        for stage in self.stages:
+            capacity = self.wall_seconds * stage.workers
+            report.append({
+                'stage': stage.name,
+                'workers': stage.workers,
+                'processed': stage.processed,
+                'failed': stage.failed,
+                'busy_seconds': round(stage.busy_seconds, 3),
+                'utilization': round(stage.busy_seconds / capacity, 3) if capacity else 0.0,
+            })
+        return report
+
+    def log_stats(self):
+        logger.info(f"⏱️  Pipeline: {self.wall_seconds:.1f}s no total")
+        for s in self.stats():
+            logger.info(f"   {s['stage']:<10} {s['workers']}w  "
+                        f"{s['processed']} ok / {s['failed']} erro  "
+                        f"ocupado {s['busy_seconds']:.1f}s  "
+                        f"utilização {s['utilization']:.0%}")
@@ -1,9 +1,7 @@
 import re
 import logging
-from sumy.parsers.plaintext import PlaintextParser
-from sumy.nlp.tokenizers import Tokenizer
-from sumy.summarizers.lsa import LsaSummarizer
-from sumy.utils import get_stop_words
+import threading
+from .cache import DiskCache, content_key
 from .config import Config
 
 logger = logging.getLogger(__name__)
@@ -15,6 +13,97 @@ LANG_MAP = {
     'es': 'spanish'
 }
 
+# Regex compilada uma vez (antes era recompilada a cada chamada)
+_TAG_RE = re.compile('<.*?>')
+_SENTENCE_RE = re.compile(r'(?<=[.!?…])\s+')
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# TextRank (engine NumPy)
+TEXTRANK_DAMPING = 0.85
+TEXTRANK_MAX_ITER = 50
+TEXTRANK_TOL = 1e-5
+
+# Cache persistente de resumos (chave: hash do texto limpo + idioma + nº de frases + engine)
+summary_cache = DiskCache(Config.SUMMARY_CACHE_FILE,
+                          max_entries=Config.SUMMARY_CACHE_MAX_ENTRIES,
+                          max_age_days=Config.SUMMARY_CACHE_MAX_AGE_DAYS)
+
+# ─── Dependências pesadas (carregadas no primeiro uso) ────────────────────
+# Sumy puxa o NLTK inteiro (~100ms+ no Pi) e o NumPy só serve ao TextRank:
+# nenhum dos dois entra no import do módulo, só quando há texto para resumir.
+_numpy = None
+
+
+def _get_numpy():
+    """Módulo numpy, ou None se não estiver instalado (engine 'textrank' é opcional)."""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+
+# ─── Registro de sumarizadores (um por idioma, criado sob demanda) ────────
+# { 'english': (Tokenizer, LsaSummarizer) }
+_summarizers = {}
+_summarizers_lock = threading.Lock()
+
+
+def _get_summarizer(full_lang_name):
+    """
+    Retorna (tokenizer, summarizer) do idioma, criando só na primeira vez.
+    Tokenizer, stopwords e LsaSummarizer são reutilizados pelo resto do processo.
+    """
+    with _summarizers_lock:
+        cached = _summarizers.get(full_lang_name)
+        if cached is not None:
+            return cached
+
+        from sumy.nlp.tokenizers import Tokenizer
+        from sumy.summarizers.lsa import LsaSummarizer
+        from sumy.utils import get_stop_words
+
+        tokenizer = Tokenizer(full_lang_name)
+        summarizer = LsaSummarizer()
+        # Tenta carregar stopwords (palavras ignoráveis como "o", "a", "de")
+        try:
+            summarizer.stop_words = get_stop_words(full_lang_name)
+        except LookupError:
+            logger.warning(f"Stopwords para {full_lang_name} não encontradas. Continuando sem elas.")
+
+        _summarizers[full_lang_name] = (tokenizer, summarizer)
+        return tokenizer, summarizer
+
+
+_stop_words = {}
+
+
+def _get_stop_words(full_lang_name):
+    """Stopwords do idioma para o engine TextRank (sem montar o Tokenizer do Sumy)."""
+    words = _stop_words.get(full_lang_name)
+    if words is None:
+        from sumy.utils import get_stop_words
+        try:
+            words = frozenset(get_stop_words(full_lang_name))
+        except LookupError:
+            words = frozenset()
+        _stop_words[full_lang_name] = words
+    return words
+
+
+def _use_textrank():
+    if Config.SUMMARY_ENGINE != 'textrank':
+        return False
+    if _get_numpy() is None:
+        logger.warning("NumPy não instalado, engine 'textrank' indisponível. Usando Sumy.")
+        Config.SUMMARY_ENGINE = 'sumy'
+        return False
+    return True
+
+
 def clean_html(raw_text):
     """
     Remove tags HTML (<br>, <p>, etc) usando Expressões Regulares (Rápido e Leve).
@@ -22,48 +111,146 @@ def clean_html(raw_text):
     if not raw_text:
         return ""
     # Remove tags HTML
-    cleanr = re.compile('<.*?>')
-    text = re.sub(cleanr, '', raw_text)
+    text = _TAG_RE.sub('', raw_text)
     # Remove espaços extras
     return " ".join(text.split())
 
+def _summarize_sumy(clean_text, language, sentences_count):
+    from sumy.parsers.plaintext import PlaintextParser
+
+    full_lang_name = LANG_MAP.get(language, 'portuguese')
+    tokenizer, summarizer = _get_summarizer(full_lang_name)
+    parser = PlaintextParser.from_string(clean_text, tokenizer)
+    summary = summarizer(parser.document, sentences_count)
+    return " ".join([str(sentence) for sentence in summary])
+
+
+def _summarize_textrank(clean_texts, language, sentences_count):
+    """
+    TextRank vetorizado com NumPy para vários textos de uma vez.
+
+    Monta uma única matriz TF-IDF (frases x termos) com todas as frases de
+    todos os textos, calcula a similaridade cosseno com um produto de
+    matrizes (mascarado para só ligar frases do mesmo texto) e roda a
+    iteração de potência do PageRank para todos os textos juntos.
+    """
+    np = _get_numpy()
+    stop_words = _get_stop_words(LANG_MAP.get(language, 'portuguese'))
+
+    sentences, doc_ids, rows = [], [], []
+    vocab = {}
+    for doc, text in enumerate(clean_texts):
+        for sentence in _SENTENCE_RE.split(text):
+            terms = [w for w in _WORD_RE.findall(sentence.lower()) if w not in stop_words]
+            if not terms:
+                continue
+            rows.append([vocab.setdefault(t, len(vocab)) for t in terms])
+            sentences.append(sentence)
+            doc_ids.append(doc)
+
+    summaries = [""] * len(clean_texts)
+    if not sentences:
+        return summaries
+
+    n = len(sentences)
+    tf = np.zeros((n, len(vocab)), dtype=np.float32)
+    row_idx = np.repeat(np.arange(n), [len(r) for r in rows])
+    np.add.at(tf, (row_idx, np.concatenate([np.asarray(r) for r in rows])), 1.0)
+
+    # TF-IDF + normalização L2 → produto interno = similaridade cosseno
+    df = np.count_nonzero(tf, axis=0)
+    tf *= np.log((1.0 + n) / (1.0 + df)) + 1.0
+    norms = np.linalg.norm(tf, axis=1, keepdims=True)
+    tf /= np.where(norms == 0, 1.0, norms)
+
+    doc_ids = np.asarray(doc_ids)
+    sim = tf @ tf.T
+    sim *= doc_ids[:, None] == doc_ids[None, :]
+    np.fill_diagonal(sim, 0.0)
+    row_sums = sim.sum(axis=1, keepdims=True)
+    transition = sim / np.where(row_sums == 0, 1.0, row_sums)
+
+    # Teleporte uniforme dentro de cada texto
+    doc_sizes = np.bincount(doc_ids)
+    teleport = 1.0 / doc_sizes[doc_ids]
+    scores = teleport.copy()
+    for _ in range(TEXTRANK_MAX_ITER):
+        updated = (1 - TEXTRANK_DAMPING) * teleport + TEXTRANK_DAMPING * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < TEXTRANK_TOL:
+            scores = updated
+            break
+        scores = updated
+
+    for doc in range(len(clean_texts)):
+        idx = np.flatnonzero(doc_ids == doc)
+        if idx.size == 0:
+            continue
+        best = idx[np.argsort(-scores[idx], kind='stable')[:sentences_count]]
+        summaries[doc] = " ".join(sentences[i] for i in np.sort(best))
+    return summaries
+
+
 def summarize_content(text, language='pt', sentences_count=Config.MAX_SUMMARY_SENTENCES):
     """
-    Gera um resumo do texto usando LSA (Latent Semantic Analysis).
+    Gera um resumo do texto usando LSA (Latent Semantic Analysis) ou
+    TextRank/NumPy, conforme Config.SUMMARY_ENGINE.
     """
-    if not text:
-        return ""
+    return summarize_many([text], language=language, sentences_count=sentences_count)[0]
+
 
-    try:
+def summarize_many(items, language='pt', sentences_count=Config.MAX_SUMMARY_SENTENCES):
+    """
+    Resume vários textos do mesmo idioma de uma vez (ex: todas as notícias
+    novas de um feed), reaproveitando o mesmo tokenizer/summarizer.
+    Com o engine 'textrank', todos os textos são pontuados numa única
+    passada vetorizada. Textos já resumidos antes vêm do summary_cache,
+    sem tokenizar nem rodar SVD/TextRank.
+
+    Returns:
+        Lista de resumos na mesma ordem de `items`
+    """
+    summaries = [""] * len(items)
+    pending = []  # (posição, texto limpo, chave do cache)
+    engine = 'textrank' if _use_textrank() else 'sumy'
+    for i, text in enumerate(items):
+        if not text:
+            continue
         # 1. Limpeza inicial
         clean_text = clean_html(text)
-        
         # Se o texto for muito curto (ex: só uma manchete), não tenta resumir, retorna ele mesmo.
         if len(clean_text.split()) < 20:
-            return clean_text
+            summaries[i] = clean_text
+            continue
+        key = content_key(clean_text, language, sentences_count, engine)
+        cached = summary_cache.get(key)
+        if cached is not None:
+            summaries[i] = cached
+        else:
+            pending.append((i, clean_text, key))
 
-        # 2. Configura o idioma correto
-        full_lang_name = LANG_MAP.get(language, 'portuguese')
-        
-        # 3. Prepara o parser do Sumy
-        parser = PlaintextParser.from_string(clean_text, Tokenizer(full_lang_name))
-        summarizer = LsaSummarizer()
-        
-        # Tenta carregar stopwords (palavras ignoráveis como "o", "a", "de")
+    if not pending:
+        return summaries
+
+    if engine == 'textrank':
         try:
-            summarizer.stop_words = get_stop_words(full_lang_name)
-        except LookupError:
-            logger.warning(f"Stopwords para {full_lang_name} não encontradas. Continuando sem elas.")
+            results = _summarize_textrank([t for _, t, _ in pending], language, sentences_count)
+            for (i, _, key), summary in zip(pending, results):
+                summaries[i] = summary
+                summary_cache.set(key, summary)
+            return summaries
+        except Exception as e:
+            logger.error(f"⚠️ Erro no TextRank, usando Sumy: {e}")
 
-        # 4. Gera o resumo
-        summary = summarizer(parser.document, sentences_count)
-        
-        # 5. Converte a lista de frases de volta para texto
-        summary_text = " ".join([str(sentence) for sentence in summary])
-        
-        return summary_text
-        
-    except Exception as e:
-        logger.error(f"⚠️ Erro ao sumarizar: {e}")
-        # Fallback: Se der erro no resumo, retorna os primeiros 300 caracteres do texto limpo
-        return clean_html(text)[:300] + "..."
\ No newline at end of file
+    for i, clean_text, key in pending:
+        try:
+            summaries[i] = _summarize_sumy(clean_text, language, sentences_count)
+            # Cacheado pelo engine que de fato resumiu: um fallback do TextRank
+            # não pode ficar servindo como resumo 'textrank'
+            if engine != 'sumy':
+                key = content_key(clean_text, language, sentences_count, 'sumy')
+            summary_cache.set(key, summaries[i])
+        except Exception as e:
+            logger.error(f"⚠️ Erro ao sumarizar: {e}")
+            # Fallback: Se der erro no resumo, retorna os primeiros 300 caracteres do texto limpo
+            summaries[i] = clean_text[:300] + "..."
+    return summaries
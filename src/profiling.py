@@ -0,0 +1,139 @@
+import cProfile
+import io
+import logging
+import pstats
+import re
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+TRACEMALLOC_FRAMES = 10   # Profundidade do traceback guardado por alocação
+
+
+def _slug(name):
+    return re.sub(r'[^A-Za-z0-9]+', '_', name).strip('_')[:40] or 'feed'
+
+
+class RunProfiler:
+    """
+    Profiling por feed para `main.py --profile[=cpu|mem|all]`.
+
+    - cpu: cProfile em volta de cada feed → logs/profile/<execução>/<feed>.pstats
+    - mem: snapshots do tracemalloc antes/depois de cada feed → <feed>_mem.txt
+      (pico de memória e as linhas que mais alocaram)
+    - write_summary(): summary.txt com as funções mais quentes somando todos
+      os feeds (pstats combinado) e as maiores alocações da execução
+
+    Em 'all' o tracemalloc deixa tudo mais lento: os tempos servem para
+    comparar funções entre si, não como tempo absoluto.
+
+    O cProfile só vê a thread que chamou process_feed. O que roda em outras
+    threads (worker do Piper, event loop do Edge-TTS, fan-out de envios)
+    aparece só como espera (future.result, acquire), e Piper/ffmpeg são
+    subprocessos. Por isso o resumo mostra também o CPU do processo inteiro
+    por feed, para comparar com o CPU da thread perfilada.
+    """
+
+    def __init__(self, mode='cpu', directory=None, top=25):
+        self.cpu = mode in ('cpu', 'all')
+        self.mem = mode in ('mem', 'all')
+        self.top = top
+        self.dir = directory or Config.LOG_DIR / "profile" / f"{datetime.now():%Y%m%d_%H%M%S}"
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.stats_files = []
+        self.feeds = []          # (feed, segundos, CPU do processo, CPU da thread, pico em bytes)
+        self.allocations = defaultdict(int)   # "arquivo:linha" → bytes somando os feeds
+
+    def _filtered(self, snapshot):
+        return snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    @contextmanager
+    def feed(self, name):
+        """Perfila o bloco (o processamento de um feed)."""
+        slug = _slug(name)
+        before = None
+        if self.mem:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+            tracemalloc.reset_peak()
+            before = self._filtered(tracemalloc.take_snapshot())
+        profiler = cProfile.Profile() if self.cpu else None
+        start = time.perf_counter()
+        cpu_start, thread_start = time.process_time(), time.thread_time()
+        if profiler:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler:
+                profiler.disable()
+            elapsed = time.perf_counter() - start
+            cpu, thread_cpu = time.process_time() - cpu_start, time.thread_time() - thread_start
+            peak = 0
+            if profiler:
+                path = self.dir / f"{slug}.pstats"
+                profiler.dump_stats(path)
+                self.stats_files.append(path)
+            if before is not None:
+                peak = tracemalloc.get_traced_memory()[1]
+                after = self._filtered(tracemalloc.take_snapshot())
+                self._write_memory_report(slug, name, peak, after.compare_to(before, 'lineno'))
+            self.feeds.append((name, elapsed, cpu, thread_cpu, peak))
+
+    def _write_memory_report(self, slug, name, peak, diffs):
+        lines = [f"{name}: pico {peak / 1024:.0f}KB", ""]
+        for diff in diffs[:self.top]:
+            frame = diff.traceback[0]
+            lines.append(f"{diff.size_diff / 1024:+10.1f}KB {diff.count_diff:+7d} blocos  "
+                         f"{frame.filename}:{frame.lineno}")
+        for diff in diffs:
+            if diff.size_diff > 0:
+                frame = diff.traceback[0]
+                self.allocations[f"{frame.filename}:{frame.lineno}"] += diff.size_diff
+        (self.dir / f"{slug}_mem.txt").write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+    def write_summary(self):
+        """Grava summary.txt e loga as funções mais quentes. Retorna o caminho."""
+        out = io.StringIO()
+        out.write(f"Perfil da execução ({len(self.feeds)} feeds)\n\n"
+                  "Atenção: o cProfile cobre só a thread que roda process_feed. TTS (worker do\n"
+                  "Piper, loop do Edge-TTS) e envios (fan-out) rodam em outras threads e só\n"
+                  "aparecem como espera; Piper/ffmpeg são subprocessos e ficam de fora.\n"
+                  "'CPU processo' soma todas as threads; a diferença para 'CPU thread' é o\n"
+                  "que as funções abaixo não mostram.\n\n"
+                  "   total  CPU processo  CPU thread\n")
+        for name, elapsed, cpu, thread_cpu, peak in sorted(self.feeds, key=lambda f: -f[1]):
+            mem = f"  pico {peak / 1024:.0f}KB" if self.mem else ""
+            out.write(f"{elapsed:7.3f}s  {cpu:11.3f}s  {thread_cpu:9.3f}s{mem}  {name}\n")
+
+        hottest = []
+        if self.stats_files:
+            stats = pstats.Stats(*map(str, self.stats_files), stream=out)
+            stats.strip_dirs()
+            for sort in ('cumulative', 'tottime'):
+                out.write(f"\n── Funções mais quentes ({sort}, todos os feeds) ──\n")
+                stats.sort_stats(sort).print_stats(self.top)
+            ranked = sorted(stats.stats.items(), key=lambda item: -item[1][2])  # tottime
+            hottest = [(f"{func[2]} ({func[0]}:{func[1]})", tt) for func, (_, _, tt, _, _) in ranked[:5]]
+
+        if self.allocations:
+            out.write("\n── Maiores alocações (soma dos feeds) ──\n")
+            for where, size in sorted(self.allocations.items(), key=lambda a: -a[1])[:self.top]:
+                out.write(f"{size / 1024:10.1f}KB  {where}\n")
+
+        path = self.dir / "summary.txt"
+        path.write_text(out.getvalue(), encoding='utf-8')
+        logger.info(f"🔬 Perfil gravado em {self.dir}")
+        for func, tottime in hottest:
+            logger.info(f"   🔥 {tottime:.3f}s  {func}")
+        return path
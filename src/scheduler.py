@@ -0,0 +1,223 @@
+import heapq
+import logging
+import random
+import threading
+import time
+from datetime import timezone
+
+from .config import Config
+from .storage import load_json, save_json
+
+logger = logging.getLogger(__name__)
+
+
+# ─── Ritmo de publicação por feed ─────────────────────────────────────────
+
+class FeedRates:
+    """
+    Histórico das datas de publicação (`published_at`) de cada feed, para
+    estimar de quanto em quanto tempo ele publica.
+
+    - data/feed_stats.json: url → datas vistas, último polling, próximo polling
+    - Intervalo médio = EWMA dos intervalos entre publicações consecutivas
+      (Config.POLL_EWMA_ALPHA), então mudanças recentes de ritmo pesam mais
+    """
+
+    def __init__(self, path=None):
+        self.path = path or Config.FEED_STATS_FILE
+        self._data = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._data is None:
+            self._data = load_json(self.path, default={}) or {}
+
+    def _entry(self, url):
+        self._load()
+        return self._data.setdefault(url, {'published': [], 'polls': 0,
+                                           'last_poll': None, 'next_poll': None})
+
+    def observe(self, url, news_items, now=None):
+        """Registra um polling e as datas de publicação dos itens coletados."""
+        now = time.time() if now is None else now
+        stamps = []
+        for item in news_items:
+            published = item.get('published_at')
+            if hasattr(published, 'timestamp'):
+                # O coletor entrega datas ingênuas em UTC; .timestamp() as leria como hora local
+                if published.tzinfo is None:
+                    published = published.replace(tzinfo=timezone.utc)
+                stamps.append(published.timestamp())
+        with self._lock:
+            entry = self._entry(url)
+            entry['polls'] += 1
+            entry['last_poll'] = now
+            entry['published'] = sorted(set(entry['published']) | set(stamps))[-Config.POLL_HISTORY_SIZE:]
+            self._dirty = True
+
+    def mean_gap(self, url):
+        """Intervalo médio (EWMA, segundos) entre publicações, ou None sem dados."""
+        with self._lock:
+            self._load()
+            published = list(self._data.get(url, {}).get('published', []))
+        if len(published) < 2:
+            return None
+        gap = None
+        for prev, cur in zip(published, published[1:]):
+            delta = cur - prev
+            gap = delta if gap is None else Config.POLL_EWMA_ALPHA * delta + (1 - Config.POLL_EWMA_ALPHA) * gap
+        return gap
+
+    def delay(self, url, now=None):
+        """
+        Espera (segundos) até o próximo polling, ou None sem histórico.
+        Se o feed está parado há mais tempo que o normal, a última publicação
+        puxa a estimativa para cima (ex: newsroom que não publica no fim de semana).
+        """
+        now = time.time() if now is None else now
+        gap = self.mean_gap(url)
+        if gap is None:
+            return None
+        with self._lock:
+            last = self._data[url]['published'][-1]
+        gap = max(gap, now - last)
+        low, high = Config.DAEMON_MIN_INTERVAL_MIN * 60, Config.POLL_MAX_INTERVAL_MIN * 60
+        return min(high, max(low, gap * Config.POLL_RATE_FACTOR))
+
+    def set_next_poll(self, url, when):
+        with self._lock:
+            self._entry(url)['next_poll'] = when
+            self._dirty = True
+
+    def get(self, url):
+        with self._lock:
+            self._load()
+            return dict(self._data.get(url, {}))
+
+    def save(self):
+        with self._lock:
+            if self._data is None or not self._dirty:
+                return
+            save_json(self.path, self._data)
+            self._dirty = False
+
+
+feed_rates = FeedRates()
+
+
+# ─── Agenda ───────────────────────────────────────────────────────────────
+
+class FeedScheduler:
+    """
+    Agenda de polling por feed para o modo daemon.
+
+    Feeds com "interval" (minutos) no feeds_config.json usam esse intervalo
+    fixo. Os demais, com `rates`, seguem o ritmo de publicação estimado por
+    FeedRates, entre Config.DAEMON_MIN_INTERVAL_MIN e Config.POLL_MAX_INTERVAL_MIN;
+    sem histórico ainda, Config.DAEMON_DEFAULT_INTERVAL_MIN. Todo reagendamento
+    leva ±Config.POLL_JITTER. Os horários ficam num heap: due() devolve os
+    feeds vencidos e seconds_until_next() diz quanto o daemon pode dormir.
+    """
+
+    def __init__(self, feeds=(), rates=None, now=None):
+        self.rates = rates
+        self._feeds = {}   # url → feed_config
+        self._due = {}     # url → horário (epoch) do próximo polling
+        self._heap = []    # (horário, url); entradas velhas são ignoradas
+        self._lock = threading.Lock()
+        self.update(feeds, now=now)
+
+    @staticmethod
+    def feed_key(feed):
+        return feed.get('url')
+
+    def mode(self, feed, now=None):
+        """'fixo', 'adaptativo' ou 'padrão' (sem histórico ainda)."""
+        if feed.get('interval'):
+            return 'fixo'
+        if self.rates is not None and self.rates.delay(self.feed_key(feed), now) is not None:
+            return 'adaptativo'
+        return 'padrão'
+
+    def interval(self, feed, now=None):
+        """Intervalo do feed em segundos (sem jitter)."""
+        minutes = feed.get('interval')
+        if not minutes and self.rates is not None:
+            delay = self.rates.delay(self.feed_key(feed), now)
+            if delay is not None:
+                return delay
+        minutes = minutes or Config.DAEMON_DEFAULT_INTERVAL_MIN
+        return max(Config.DAEMON_MIN_INTERVAL_MIN, float(minutes)) * 60
+
+    def _push(self, key, when):
+        self._due[key] = when
+        heapq.heappush(self._heap, (when, key))
+
+    def update(self, feeds, now=None):
+        """
+        Troca a lista de feeds (ex: feeds_config.json recarregado). Feeds que
+        já existiam mantêm o horário; feeds novos vencem imediatamente, ou no
+        próximo polling gravado em FeedRates (daemon reiniciado).
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            feeds = {self.feed_key(f): f for f in feeds if self.feed_key(f)}
+            for key in set(self._feeds) - set(feeds):
+                self._due.pop(key, None)
+            self._feeds = feeds
+            for key in feeds:
+                if key not in self._due:
+                    saved = self.rates.get(key).get('next_poll') if self.rates is not None else None
+                    self._push(key, max(now, saved or now))
+
+    def due(self, now=None):
+        """Remove da agenda e devolve os feeds vencidos (reagendar com reschedule)."""
+        now = time.time() if now is None else now
+        ready = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                when, key = heapq.heappop(self._heap)
+                if self._due.get(key) != when:
+                    continue  # entrada substituída ou feed removido
+                del self._due[key]
+                ready.append(self._feeds[key])
+        return ready
+
+    def reschedule(self, feed, now=None, delay=None):
+        """Agenda o próximo polling do feed (padrão: agora + intervalo ± jitter)."""
+        now = time.time() if now is None else now
+        key = self.feed_key(feed)
+        with self._lock:
+            if key not in self._feeds:
+                return  # removido do feeds_config.json durante a leva
+            feed = self._feeds[key]
+        if delay is None:
+            # Jitter antes do piso/teto, senão um feed preso no limite sempre
+            # passaria dele (ou ficaria sem jitter quando cortado)
+            base = self.interval(feed, now)
+            jitter = 1 + random.uniform(-Config.POLL_JITTER, Config.POLL_JITTER)
+            low = Config.DAEMON_MIN_INTERVAL_MIN * 60
+            high = max(Config.POLL_MAX_INTERVAL_MIN * 60, base)  # "interval" fixo maior vale
+            delay = min(high, max(low, base * jitter))
+        with self._lock:
+            if key not in self._feeds:
+                return
+            self._push(key, now + delay)
+        if self.rates is not None:
+            self.rates.set_next_poll(key, now + delay)
+
+    def seconds_until_next(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            pending = list(self._due.values())
+        return max(0.0, min(pending) - now) if pending else None
+
+    def schedule(self):
+        """Lista (feed_config, próximo polling) ordenada pelo horário."""
+        with self._lock:
+            return sorted(((self._feeds[k], when) for k, when in self._due.items()),
+                          key=lambda item: item[1])
+
+    def __len__(self):
+        return len(self._feeds)
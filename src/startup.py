@@ -0,0 +1,96 @@
+import subprocess
+import sys
+from collections import defaultdict
+
+from .config import Config
+
+# Dependências carregadas sob demanda (fora do import do main.py)
+LAZY_MODULES = ('feedparser', 'requests', 'sumy.nlp.tokenizers', 'numpy', 'edge_tts', 'dotenv')
+
+
+class ImportProfileError(Exception):
+    """O import medido falhou (a mensagem traz o stderr do Python filho)."""
+
+
+def _importtime(statement):
+    """
+    Roda `statement` num Python novo com -X importtime.
+
+    Returns:
+        [(módulo, self_us, cumulativo_us, profundidade)]
+
+    Raises:
+        ImportProfileError: se o import falhou
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            cwd=Config.BASE_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        errors = [l for l in result.stderr.splitlines() if not l.startswith('import time:')]
+        raise ImportProfileError("\n".join(errors).strip())
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def import_profile(module='main'):
+    """
+    Tempo de import de `module` num processo frio.
+
+    Returns:
+        (total_ms, {pacote: ms}) — total é o cumulativo do módulo; o dicionário
+        soma o tempo próprio de cada import por pacote raiz (ex: 'nltk', 'src')
+
+    Raises:
+        ImportProfileError: se `module` não importa
+    """
+    rows = _importtime(f"import {module}")
+    total = next((cum for name, _, cum, depth in rows if name == module and depth <= 1), None)
+    if total is None:
+        raise ImportProfileError(f"{module} não aparece na saída do -X importtime")
+    packages = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        packages[name.split('.')[0]] += self_us
+    return total / 1000, {pkg: us / 1000 for pkg, us in packages.items()}
+
+
+def lazy_costs():
+    """Custo (ms) de cada dependência carregada sob demanda; None se não instalada."""
+    costs = {}
+    for module in LAZY_MODULES:
+        try:
+            rows = _importtime(f"import {module}")
+        except ImportProfileError:
+            rows = []
+        root = [cum for name, _, cum, depth in rows if name == module]
+        costs[module] = root[-1] / 1000 if root else None
+    return costs
+
+
+def print_startup_profile(top=15):
+    """
+    Mostra o tempo de import do main.py por pacote.
+    Returns True se importou e ficou dentro do orçamento.
+    """
+    try:
+        total, packages = import_profile('main')
+    except ImportProfileError as e:
+        print(f"❌ Import do main.py falhou:\n{e}")
+        return False
+    print(f"⏱️  Import do main.py: {total:.1f}ms (orçamento {Config.STARTUP_BUDGET_MS}ms)")
+    print(f"   {'Pacote':<24} {'ms':>8}")
+    for pkg, ms in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"   {pkg:<24} {ms:>8.1f}")
+
+    print("💤 Carregados só no primeiro uso:")
+    for module, ms in lazy_costs().items():
+        print(f"   {module:<24} {'não instalado' if ms is None else f'{ms:.1f}':>8}")
+
+    within = total <= Config.STARTUP_BUDGET_MS
+    if not within:
+        print(f"⚠️  Acima do orçamento em {total - Config.STARTUP_BUDGET_MS:.1f}ms")
+    return within
@@ -0,0 +1,53 @@
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def load_json(path, default=None):
+    """Lê um arquivo JSON. Retorna `default` se não existir ou estiver corrompido."""
+    path = Path(path)
+    if not path.exists():
+        return default
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError) as e:
+        logger.warning(f"⚠️  Arquivo inválido ignorado ({path.name}): {e}")
+        return default
+
+
+def _atomic_write(path, write):
+    """
+    Grava de forma atômica: escreve num arquivo temporário na mesma pasta e
+    troca com os.replace, então um crash nunca deixa o arquivo pela metade.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)  # mkstemp cria com 0600
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def save_json(path, data, **dump_kwargs):
+    """Grava JSON de forma atômica (ver _atomic_write)."""
+    _atomic_write(path, lambda f: json.dump(data, f, ensure_ascii=False, **dump_kwargs))
+
+
+def save_text(path, text):
+    """Grava texto de forma atômica (ex: textfile do node_exporter, que lê a qualquer momento)."""
+    _atomic_write(path, lambda f: f.write(text))
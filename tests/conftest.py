@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Os testes importam `src.*` a partir da raiz do projeto (sem pacote instalável)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,269 @@
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from src import collector
+from src.config import Config
+from src.storage import load_json
+
+FIXTURES = sorted((Path(__file__).resolve().parent.parent / "benchmarks" / "fixtures" / "feeds").glob("*.xml"))
+
+
+def chunked(body, size):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+def _comparable(items):
+    return [(item['title'], item['link'], item['raw_summary'].strip(), item['published_at'])
+            for item in items]
+
+
+# ─── Equivalência com o feedparser ─────────────────────────────────────────
+
+@pytest.mark.parametrize('path', FIXTURES, ids=lambda p: p.stem)
+@pytest.mark.parametrize('chunk_size', [512, 64 * 1024])
+def test_stream_parser_matches_feedparser_on_fixtures(path, chunk_size):
+    body = path.read_bytes()
+    streamed, _ = collector._read_entries(path.name, chunked(body, chunk_size), 5)
+    expected = collector._parse_with_feedparser(path.name, body, 5)
+    assert streamed
+    assert _comparable(streamed) == _comparable(expected)
+
+
+def test_fixtures_exist():
+    assert len(FIXTURES) >= 10
+
+
+# ─── Parada antecipada ─────────────────────────────────────────────────────
+
+def _rss(count, description="x"):
+    items = "".join(f"<item><title>T{i}</title><link>http://x/{i}</link>"
+                    f"<description>{description}</description></item>" for i in range(count))
+    return f'<?xml version="1.0"?><rss version="2.0"><channel>{items}</channel></rss>'.encode()
+
+
+def test_stops_reading_once_limit_entries_parsed():
+    body = _rss(2000, "d" * 200)
+    read = []
+
+    def chunks():
+        for chunk in chunked(body, 1024):
+            read.append(len(chunk))
+            yield chunk
+
+    items, _ = collector._read_entries('u', chunks(), 2)
+    assert [item['title'] for item in items] == ['T0', 'T1']
+    assert sum(read) < 2048 < len(body)
+
+
+def test_hash_is_stable_while_first_entries_do_not_change():
+    old = _rss(50)
+    new = old.replace(b"<title>T40</title>", b"<title>Mudou</title>")
+    _, old_hash = collector._read_entries('u', chunked(old, 256), 2)
+    _, new_hash = collector._read_entries('u', chunked(new, 256), 2)
+    assert old_hash == new_hash
+
+
+# ─── Formatos e fallback ───────────────────────────────────────────────────
+
+def test_atom_entries():
+    body = b'''<?xml version="1.0"?><feed xmlns="http://www.w3.org/2005/Atom">
+      <entry><title type="html">A &amp;amp; B</title>
+        <link rel="self" href="http://x/self"/><link rel="alternate" href="http://x/1"/>
+        <updated>2026-01-02T10:00:00Z</updated><summary>resumo</summary></entry>
+      <entry><title>Dois</title><link href="http://x/2"/>
+        <published>2026-01-02T09:00:00+02:00</published><content>texto</content></entry>
+    </feed>'''
+    items, _ = collector._read_entries('u', chunked(body, 40), 5)
+    assert [(i['title'], i['link'], i['raw_summary']) for i in items] == [
+        ('A &amp; B', 'http://x/1', 'resumo'), ('Dois', 'http://x/2', 'texto')]
+    # Datas em UTC ingênuo, como o feedparser entrega
+    assert [i['published_at'] for i in items] == [datetime(2026, 1, 2, 10), datetime(2026, 1, 2, 7)]
+
+
+def test_core_elements_win_over_other_namespaces():
+    path = Path(__file__).resolve().parent / "fixtures" / "media_namespaces.xml"
+    body = path.read_bytes()
+    items, _ = collector._read_entries(path.name, chunked(body, 128), 5)
+    assert _comparable(items) == _comparable(collector._parse_with_feedparser(path.name, body, 5))
+    # media:title / itunes:summary vêm antes, mas não substituem title/description;
+    # o &amp;lt; do feed é decodificado uma única vez
+    assert items[0]['title'] == 'Manchete real &lt;b&gt; com entidade'
+    assert items[0]['raw_summary'] == 'Descrição real da notícia.'
+    assert items[0]['link'] == 'https://example.com/noticia-1'
+    # Sem elementos do formato, as extensões completam o item
+    assert items[1]['raw_summary'] == '<p>Só content:encoded</p>'
+    assert items[1]['published_at'] == datetime(2026, 10, 5, 9)
+
+
+def test_html_entities_fall_back_to_feedparser():
+    body = b'<rss version="2.0"><channel><item><title>x&nbsp;y</title><link>l</link></item></channel></rss>'
+    items, _ = collector._read_entries('u', chunked(body, 16), 5)
+    assert items[0]['title'] == 'x\xa0y'
+
+
+def test_fallback_uses_charset_from_content_type(monkeypatch):
+    seen = {}
+    import feedparser
+    parse = feedparser.parse
+
+    def spy(body, **kwargs):
+        seen.update(kwargs)
+        return parse(body, **kwargs)
+
+    monkeypatch.setattr(feedparser, 'parse', spy)
+    body = '<rss version="2.0"><channel><item><title>Ação&nbsp;já</title></item></channel></rss>'
+    items, _ = collector._read_entries('u', iter([body.encode('latin-1')]), 5,
+                                       'application/rss+xml; charset=iso-8859-1')
+    assert seen['response_headers'] == {'content-type': 'application/rss+xml; charset=iso-8859-1'}
+    assert items[0]['title'] == 'Ação\xa0já'
+
+
+# ─── Teto de bytes ─────────────────────────────────────────────────────────
+
+class FakeRaw:
+    def __init__(self, body):
+        self.body = body
+
+    def stream(self, size, decode_content=True):
+        return chunked(self.body, size)
+
+
+class FakeResponse:
+    def __init__(self, body, headers=None):
+        self.raw = FakeRaw(body)
+        self.headers = headers or {}
+
+
+def test_max_bytes_applies_to_bytes_read_not_content_length(monkeypatch):
+    monkeypatch.setattr(Config, 'FEED_CHUNK_SIZE', 1024)
+    body = _rss(2000)
+    resp = FakeResponse(body, {'Content-Length': str(len(body))})
+    # Content-Length acima do teto, mas as notícias vêm logo no começo
+    items, _ = collector._read_entries('u', collector._read_chunks(resp, max_bytes=4096), 2)
+    assert [item['title'] for item in items] == ['T0', 'T1']
+
+
+def test_max_bytes_aborts_when_entries_do_not_arrive(monkeypatch):
+    monkeypatch.setattr(Config, 'FEED_CHUNK_SIZE', 1024)
+    body = b'<rss><channel><title>' + b'x' * 10000 + b'</title></channel></rss>'
+    with pytest.raises(collector.FeedTooLarge):
+        collector._read_entries('u', collector._read_chunks(FakeResponse(body), max_bytes=4096), 2)
+
+
+# ─── Validadores só confirmados depois da entrega ─────────────────────────
+
+@pytest.fixture
+def feed_server(tmp_path, monkeypatch):
+    """Servidor local com ETag/304; o estado do cache de validadores é isolado."""
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    body = _rss(5)
+    etag = '"v1"'
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(Config, 'FEED_CACHE_FILE', tmp_path / "feed_cache.json")
+    monkeypatch.setattr(collector, '_feed_cache', None)
+    monkeypatch.setattr(collector, '_pending_validators', {})
+    yield f"http://127.0.0.1:{server.server_port}/feed.xml"
+    server.shutdown()
+
+
+def _fresh_run():
+    """Simula uma execução nova: só o que foi gravado em disco sobrevive."""
+    collector._feed_cache = None
+
+
+def test_uncommitted_validators_are_not_saved(feed_server):
+    assert collector.collect_feed_data(feed_server, limit=2)
+    collector.save_feed_cache()      # feed falhou no pipeline: nada confirmado
+    _fresh_run()
+    assert [i['title'] for i in collector.collect_feed_data(feed_server, limit=2)] == ['T0', 'T1']
+
+
+def test_committed_validators_skip_the_feed_next_run(feed_server):
+    assert collector.collect_feed_data(feed_server, limit=2)
+    collector.commit_validators(feed_server)
+    collector.save_feed_cache()
+    _fresh_run()
+    assert collector.collect_feed_data(feed_server, limit=2) == []
+    assert load_json(Config.FEED_CACHE_FILE)[feed_server]['etag'] == '"v1"'
+
+
+# ─── Reaproveitamento de conexão ───────────────────────────────────────────
+
+@pytest.fixture
+def chunked_server():
+    """Servidor HTTP/1.1 que responde em Transfer-Encoding: chunked."""
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    body = _rss(300)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for chunk in chunked(body, 1000):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", len(body)
+    server.shutdown()
+
+
+def _fetch_two_entries(url):
+    with collector._fetch(url, {}) as (_, chunks, _):
+        items, _ = collector._read_entries(url, chunks, 2)
+    return items
+
+
+def test_chunked_response_is_drained_and_connection_reused(chunked_server, monkeypatch):
+    base, size = chunked_server
+    monkeypatch.setattr(Config, 'FEED_DRAIN_BYTES', size)
+    before = collector.get_connection_stats()
+    assert len(_fetch_two_entries(f"{base}/a.xml")) == 2
+    assert len(_fetch_two_entries(f"{base}/b.xml")) == 2
+    after = collector.get_connection_stats()
+    assert after['requests'] - before['requests'] == 2
+    assert after['connections'] - before['connections'] == 1
+
+
+def test_long_chunked_response_closes_connection(chunked_server, monkeypatch):
+    base, _ = chunked_server
+    monkeypatch.setattr(Config, 'FEED_DRAIN_BYTES', 1024)
+    before = collector.get_connection_stats()
+    _fetch_two_entries(f"{base}/a.xml")
+    _fetch_two_entries(f"{base}/b.xml")
+    after = collector.get_connection_stats()
+    assert after['connections'] - before['connections'] == 2
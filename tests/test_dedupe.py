@@ -0,0 +1,66 @@
+import pytest
+
+from src.config import Config
+from src.dedupe import DedupeIndex, normalize_title
+
+
+@pytest.fixture(autouse=True)
+def dedupe_config(monkeypatch):
+    monkeypatch.setattr(Config, 'DEDUPE_SIMILARITY', 0.8)
+    monkeypatch.setattr(Config, 'DEDUPE_MIN_SHINGLES', 3)
+    monkeypatch.setattr(Config, 'DEDUPE_MAX_POSTING', 200)
+
+
+def test_normalize_title_drops_html_case_and_punctuation():
+    assert normalize_title("<b>Brasil</b> vence, de novo!") == ['brasil', 'vence', 'de', 'novo']
+
+
+def test_exact_match_ignores_case_and_punctuation():
+    index = DedupeIndex(["Governo anuncia novo plano"])
+    assert index.is_duplicate("GOVERNO anuncia: novo plano!")
+    assert not index.is_duplicate("Governo anuncia novo orçamento")
+
+
+def test_rewritten_headline_with_source_suffix_is_duplicate():
+    index = DedupeIndex(["Government announces new budget plan for schools"])
+    assert index.is_duplicate("Government announces new budget plan for schools - BBC News")
+
+
+def test_similarity_threshold_is_inclusive():
+    # 6 palavras = 5 bigramas no título original
+    index = DedupeIndex(["alpha beta gamma delta epsilon zeta"])
+    assert index.is_duplicate("alpha beta gamma delta epsilon omega")    # 4/5 = 0.8
+    assert not index.is_duplicate("alpha beta gamma delta omega sigma")  # 3/5 = 0.6
+
+
+def test_threshold_follows_config(monkeypatch):
+    index = DedupeIndex(["alpha beta gamma delta epsilon zeta"])
+    monkeypatch.setattr(Config, 'DEDUPE_SIMILARITY', 0.6)
+    assert index.is_duplicate("alpha beta gamma delta omega sigma")
+
+
+def test_short_titles_only_match_exactly():
+    index = DedupeIndex(["Breaking news today"])   # 2 bigramas < DEDUPE_MIN_SHINGLES
+    assert index.is_duplicate("breaking news today")
+    assert not index.is_duplicate("Breaking news tonight")
+
+
+def test_common_bigrams_are_ignored(monkeypatch):
+    monkeypatch.setattr(Config, 'DEDUPE_MAX_POSTING', 2)
+    index = DedupeIndex([f"live updates day {n} of the summit" for n in range(3)])
+    # Todos os bigramas em comum estão em listas maiores que o limite
+    assert not index.is_duplicate("live updates day 9 of the summit")
+    assert len(index) == 3
+
+
+def test_history_uses_the_same_title_hash(tmp_path, monkeypatch):
+    from src.dedupe import title_hash
+    from src.history import HistoryStore
+
+    monkeypatch.setattr(Config, 'HISTORY_FILE', tmp_path / "history.json")
+    store = HistoryStore(tmp_path / "history.db")
+    store.add_many([{'title': "<b>Brasil</b> vence, de novo!"}])
+    assert store.has_title("brasil vence de novo")
+    row = store._conn.execute("SELECT title_hash FROM items").fetchone()
+    assert row[0] == title_hash("Brasil vence de novo") in DedupeIndex(["Brasil vence de novo"])._exact
+    store.close()
@@ -0,0 +1,208 @@
+import time
+
+import pytest
+
+from src import notifier
+from src.config import Config
+from src.notifier import TokenBucket
+from src.storage import load_json, save_json
+
+
+class FakeClock:
+    """Relógio simulado: sleep() só avança o tempo e registra a espera."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+# ─── TokenBucket ───────────────────────────────────────────────────────────
+
+def test_bucket_spaces_sends_by_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, capacity=1, clock=clock, sleep=clock.sleep)
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.sleeps == pytest.approx([1.0, 1.0])
+    assert clock.now == pytest.approx(2.0)
+
+
+def test_bucket_allows_burst_up_to_capacity():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=30, capacity=30, clock=clock, sleep=clock.sleep)
+    for _ in range(30):
+        bucket.acquire()
+    assert clock.sleeps == []
+    bucket.acquire()
+    assert clock.sleeps == pytest.approx([1 / 30])
+
+
+def test_group_rate_is_twenty_per_minute():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=20 / 60, clock=clock, sleep=clock.sleep)
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.now == pytest.approx(3.0)
+
+
+def test_idle_time_refills_but_not_past_capacity():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, capacity=2, clock=clock, sleep=clock.sleep)
+    bucket.acquire()
+    bucket.acquire()
+    clock.now += 100          # parado muito tempo: volta só a `capacity`
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.sleeps == pytest.approx([1.0])
+
+
+@pytest.mark.parametrize('chat_id, rate', [
+    ('123456', 'TELEGRAM_CHAT_RATE'),
+    (123456, 'TELEGRAM_CHAT_RATE'),
+    ('-1001234567890', 'TELEGRAM_GROUP_RATE'),
+    ('@canal_pt', 'TELEGRAM_GROUP_RATE'),
+])
+def test_wait_turn_picks_bucket_by_chat_kind(monkeypatch, chat_id, rate):
+    monkeypatch.setattr(notifier, '_chat_buckets', {})
+    notifier._wait_turn(chat_id)
+    assert notifier._chat_buckets[chat_id].rate == getattr(Config, rate)
+
+
+# ─── Outbox e retentativas ─────────────────────────────────────────────────
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    path = tmp_path / "outbox.json"
+    monkeypatch.setattr(Config, 'OUTBOX_FILE', path)
+    monkeypatch.setattr(notifier, '_delivery_stats', {})
+    return path
+
+
+def _message(chat_id='1', text='oi'):
+    return {'kind': 'message', 'chat_id': chat_id, 'text': text}
+
+
+def test_send_keeps_retryable_failures_in_outbox(outbox, monkeypatch):
+    monkeypatch.setattr(notifier, '_deliver', lambda job: (False, True))
+    assert notifier._send(_message()) is False
+    jobs = load_json(outbox)
+    assert [job['text'] for job in jobs] == ['oi']
+    assert jobs[0]['id'] and jobs[0]['queued_at']
+
+
+def test_send_drops_permanent_failures(outbox, monkeypatch):
+    monkeypatch.setattr(notifier, '_deliver', lambda job: (False, False))
+    assert notifier._send(_message()) is False
+    assert not outbox.exists()
+
+
+def test_flush_outbox_resends_and_keeps_only_retryable(outbox, monkeypatch):
+    now = time.time()
+    save_json(outbox, [
+        dict(_message(text='entregue'), queued_at=now),
+        dict(_message(text='de novo'), queued_at=now),
+        dict(_message(text='definitivo'), queued_at=now),
+        dict(_message(text='velho'), queued_at=now - Config.OUTBOX_MAX_AGE_HOURS * 3600 - 1),
+    ])
+    outcomes = {'entregue': (True, False), 'de novo': (False, True), 'definitivo': (False, False)}
+    attempted = []
+
+    def deliver(job):
+        attempted.append(job['text'])
+        return outcomes[job['text']]
+
+    monkeypatch.setattr(notifier, '_deliver', deliver)
+    assert notifier.flush_outbox() == 1
+    assert attempted == ['entregue', 'de novo', 'definitivo']   # o velho nem é tentado
+    assert [job['text'] for job in load_json(outbox)] == ['de novo']
+
+
+def test_audio_still_in_outbox_survives_cache_eviction(outbox, tmp_path):
+    from src.audio_cache import AudioCache
+
+    cache = AudioCache(directory=tmp_path / "audio" / "cache", max_bytes=1)
+    cache.dir.mkdir(parents=True)
+    paths = {}
+    for key in ('pendente', 'livre'):
+        paths[key] = cache.path_for(key, 'mp3')
+        paths[key].write_bytes(b'x' * 10)
+        cache.store(key, paths[key])
+    save_json(outbox, [{'kind': 'audio', 'chat_id': '1', 'path': str(paths['pendente']),
+                        'queued_at': time.time()}])
+
+    assert cache.evict(keep=notifier.outbox_paths()) == 1
+    assert paths['pendente'].exists() and not paths['livre'].exists()
+
+
+class FakeResponse:
+    def __init__(self, status, body):
+        self.status_code = status
+        self.ok = status < 400
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def post(self, url, **kwargs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    """_telegram_request com sessão falsa, sem limite de taxa e sem dormir de verdade."""
+    sleeps = []
+    monkeypatch.setattr(notifier, '_wait_turn', lambda chat_id: None)
+    monkeypatch.setattr(notifier.time, 'sleep', sleeps.append)
+    monkeypatch.setattr(notifier, '_backoff', lambda attempt: 2 ** attempt)
+    monkeypatch.setattr(Config, 'TELEGRAM_MAX_RETRIES', 2)
+
+    def install(responses):
+        session = FakeSession(responses)
+        monkeypatch.setattr(notifier, '_get_session', lambda: session)
+        return session
+
+    return install, sleeps
+
+
+def test_429_waits_retry_after_then_succeeds(telegram):
+    install, sleeps = telegram
+    session = install([
+        FakeResponse(429, {'ok': False, 'parameters': {'retry_after': 7}}),
+        FakeResponse(200, {'ok': True, 'result': {}}),
+    ])
+    body, retryable, error = notifier._telegram_request('sendMessage', '1', data={})
+    assert body == {'ok': True, 'result': {}}
+    assert sleeps == [7]
+    assert session.calls == 2
+
+
+def test_server_errors_back_off_then_give_up_as_retryable(telegram):
+    install, sleeps = telegram
+    session = install([FakeResponse(502, {})] * 3)
+    body, retryable, error = notifier._telegram_request('sendMessage', '1', data={})
+    assert body is None and retryable
+    assert sleeps == [1, 2]        # backoff entre as 3 tentativas, não depois da última
+    assert session.calls == 3
+
+
+def test_bad_request_is_not_retried(telegram):
+    install, sleeps = telegram
+    session = install([FakeResponse(400, {'ok': False, 'description': "can't parse entities"})])
+    body, retryable, error = notifier._telegram_request('sendMessage', '1', data={})
+    assert body is None and not retryable
+    assert error == "can't parse entities"
+    assert session.calls == 1 and sleeps == []
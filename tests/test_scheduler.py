@@ -0,0 +1,48 @@
+import pytest
+
+from src import scheduler as scheduler_module
+from src.config import Config
+from src.scheduler import FeedScheduler
+
+
+@pytest.fixture(autouse=True)
+def limits(monkeypatch):
+    monkeypatch.setattr(Config, 'DAEMON_MIN_INTERVAL_MIN', 5)
+    monkeypatch.setattr(Config, 'POLL_MAX_INTERVAL_MIN', 60)
+    monkeypatch.setattr(Config, 'POLL_JITTER', 0.1)
+
+
+def _delay_with_jitter(monkeypatch, feed, factor):
+    monkeypatch.setattr(scheduler_module.random, 'uniform', lambda low, high: factor)
+    sched = FeedScheduler([feed], now=0)
+    sched.due(now=0)
+    sched.reschedule(feed, now=0)
+    return sched.seconds_until_next(now=0)
+
+
+def test_jitter_never_goes_below_the_floor(monkeypatch):
+    feed = {'url': 'http://x', 'interval': 5}
+    assert _delay_with_jitter(monkeypatch, feed, -0.1) == 5 * 60
+    assert _delay_with_jitter(monkeypatch, feed, 0.1) == pytest.approx(5.5 * 60)
+
+
+def test_jitter_never_goes_above_the_ceiling(monkeypatch):
+    class Rates:
+        def delay(self, url, now=None):
+            return 60 * 60
+
+        def get(self, url):
+            return {}
+
+        def set_next_poll(self, url, when):
+            pass
+
+    monkeypatch.setattr(scheduler_module.random, 'uniform', lambda low, high: 0.1)
+    sched = FeedScheduler([{'url': 'http://x'}], rates=Rates(), now=0)
+    sched.due(now=0)
+    sched.reschedule({'url': 'http://x'}, now=0)
+    assert sched.seconds_until_next(now=0) == 60 * 60
+
+
+def test_fixed_interval_above_the_ceiling_is_kept(monkeypatch):
+    assert _delay_with_jitter(monkeypatch, {'url': 'http://x', 'interval': 120}, 0.1) == 120 * 60
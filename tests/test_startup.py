@@ -0,0 +1,30 @@
+import pytest
+
+from src import startup
+from src.config import Config
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'BASE_DIR', tmp_path)
+    return tmp_path
+
+
+def test_import_profile_measures_module(project):
+    (project / "okmain.py").write_text("import json\n")
+    total, packages = startup.import_profile('okmain')
+    assert total > 0
+    assert 'okmain' in packages
+
+
+def test_failed_import_raises_with_stderr(project):
+    (project / "brokenmain.py").write_text("import modulo_que_nao_existe\n")
+    with pytest.raises(startup.ImportProfileError, match="modulo_que_nao_existe"):
+        startup.import_profile('brokenmain')
+
+
+def test_startup_profile_fails_when_main_does_not_import(project, monkeypatch, capsys):
+    (project / "main.py").write_text("raise RuntimeError('quebrado')\n")
+    monkeypatch.setattr(startup, 'LAZY_MODULES', ())
+    assert startup.print_startup_profile() is False
+    assert "quebrado" in capsys.readouterr().out